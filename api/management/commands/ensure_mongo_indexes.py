@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the MongoDB indexes the read paths rely on and mark records without an isDeleted "
+        "flag as not deleted. Safe to run repeatedly; run it once per deployment, not per worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retries', type=int, default=3, help="Connection attempts before giving up")
+
+    def handle(self, *args, **options):
+        # Imported here so other management commands do not load the analytics modules
+        from linearregression_predictiveanalysis import ensure_indexes
+        from recommendations import ensure_recommendation_indexes
+
+        try:
+            ensure_indexes(retries=options['retries'])
+            ensure_recommendation_indexes(retries=options['retries'])
+        except Exception as e:
+            raise CommandError(f"Could not ensure MongoDB indexes: {e}")
+        self.stdout.write(self.style.SUCCESS("MongoDB indexes are in place"))
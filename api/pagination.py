@@ -0,0 +1,90 @@
+import base64
+import json
+from bson import ObjectId
+
+# Page size used when only a next token is given, and the largest page a client may ask for
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+def is_paginated(request):
+    """
+    Return True if the request asked for a page with limit= or next=.
+    """
+    return 'limit' in request.GET or 'next' in request.GET
+
+def parse_fields(request):
+    """
+    Turn ?fields=Year,Solar (GWh) into a MongoDB projection, or None for every field.
+    _id is always returned because pages are keyed on it.
+    """
+    fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    if not fields:
+        return None
+    return {field: 1 for field in fields}
+
+def parse_limit(request):
+    """
+    Return the requested page size, bounded by MAX_PAGE_LIMIT. Raises ValueError if it is not a positive number.
+    """
+    limit = int(request.GET.get('limit', DEFAULT_PAGE_LIMIT))
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_LIMIT)
+
+def encode_token(document, sort_keys):
+    """
+    Build the opaque token pointing after a document.
+    """
+    values = [str(document['_id']) if key == '_id' else document.get(key) for key in sort_keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_token(token, sort_keys):
+    """
+    Return the sort key values stored in a token. Raises ValueError if the token is invalid.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(sort_keys):
+            raise ValueError
+        return [ObjectId(value) if key == '_id' else value for key, value in zip(sort_keys, values)]
+    except Exception:
+        raise ValueError("Invalid next token")
+
+def _after(sort_keys, values):
+    """
+    Build the query matching documents that sort after the given key values.
+    """
+    if sort_keys == ['_id']:
+        return {'_id': {'$gt': values[0]}}
+    key, last_value = sort_keys[0], values[0]
+    last_id = values[1]
+    if last_value is None:
+        # Documents without the key sort first
+        return {'$or': [{key: None, '_id': {'$gt': last_id}}, {key: {'$ne': None}}]}
+    return {'$or': [{key: {'$gt': last_value}}, {key: last_value, '_id': {'$gt': last_id}}]}
+
+def fetch_page(collection, query, request, sort_keys, projection=None):
+    """
+    Return one page of documents in sort_keys order and the token for the next page (None on the last page).
+    sort_keys is ['_id'] or [field, '_id']; each page is a single indexed range scan.
+    Sort keys missing from an inclusion projection are fetched for the token and removed from the documents.
+    """
+    limit = parse_limit(request)
+    token = request.GET.get('next')
+    if token:
+        page_query = {'$and': [query, _after(sort_keys, decode_token(token, sort_keys))]}
+    else:
+        page_query = query
+    # The token is built from the sort keys, so they are fetched even if the projection leaves them out
+    added_keys = []
+    if projection is not None:
+        added_keys = [key for key in sort_keys if key != '_id' and key not in projection]
+        projection = dict(projection, **{key: 1 for key in added_keys})
+    cursor = collection.find(page_query, projection).sort([(key, 1) for key in sort_keys]).limit(limit + 1)
+    documents = list(cursor)
+    next_token = encode_token(documents[limit - 1], sort_keys) if len(documents) > limit else None
+    documents = documents[:limit]
+    for document in documents:
+        for key in added_keys:
+            document.pop(key, None)
+    return documents, next_token
@@ -0,0 +1,107 @@
+import json
+import math
+from datetime import date, datetime
+import numpy as np
+from bson import ObjectId
+from django.http import HttpResponse, StreamingHttpResponse
+
+# orjson is much faster on large payloads; fall back to the standard library when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Documents fetched from MongoDB per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+def _default(value):
+    """
+    Convert values the JSON encoders do not handle natively. Non-finite floats become null.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, np.ndarray):
+        return _sanitize(value.tolist())
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        value = float(value)
+        return value if math.isfinite(value) else None
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _sanitize(value):
+    """
+    Replace non-finite floats with None and convert NumPy and BSON values, recursively.
+    Only needed by the standard library encoder, which has no hook for floats.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _sanitize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_sanitize(item) for item in value]
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    return _default(value)
+
+def dumps(data):
+    """
+    Serialize data to JSON bytes, handling ObjectId, NumPy scalars and arrays, NaN/inf and datetimes.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_sanitize(data), allow_nan=False).encode('utf-8')
+
+def json_response(data, status=200):
+    """
+    Return a JSON HttpResponse built with the shared encoder.
+    """
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+def parse_format(request, allowed=('records', 'columnar')):
+    """
+    Return the response layout asked for with ?format=, 'records' by default.
+    Raises ValueError for a layout the endpoint does not support.
+    """
+    layout = request.GET.get('format', 'records').lower()
+    if layout not in allowed:
+        raise ValueError(f"Unsupported format '{layout}'. Supported formats: {list(allowed)}")
+    return layout
+
+def wants_stream(request):
+    """
+    Return True if the client asked for an NDJSON stream with ?stream=1 or an Accept header.
+    """
+    if request.GET.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'application/x-ndjson' in request.headers.get('Accept', '')
+
+def iter_ndjson(documents):
+    """
+    Yield one JSON line per document, grouping lines into chunks to limit write calls.
+    """
+    chunk = []
+    for document in documents:
+        chunk.append(dumps(document))
+        if len(chunk) >= STREAM_BATCH_SIZE:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+def stream_documents(documents):
+    """
+    Stream any iterable of documents as NDJSON.
+    """
+    return StreamingHttpResponse(iter_ndjson(documents), content_type='application/x-ndjson')
+
+def stream_cursor(cursor, batch_size=STREAM_BATCH_SIZE):
+    """
+    Stream a MongoDB cursor as NDJSON. Documents are read in batches of batch_size,
+    so memory stays flat however large the collection is.
+    """
+    return stream_documents(cursor.batch_size(batch_size))
@@ -1,3 +1,74 @@
-from django.test import TestCase
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from linearregression_predictiveanalysis import (
+    FEATURES,
+    compute_sufficient_statistics,
+    update_statistics,
+    _solve_ols,
+)
+
+TARGET = 'Solar (GWh)'
+
+
+def make_records(years, seed=0):
+    """
+    Build predictiveAnalysis-like records with the magnitudes of the real dataset.
+    """
+    rng = np.random.default_rng(seed)
+    records = []
+    for year in years:
+        population = 80 + 1.6 * (year - 2000) + rng.normal(0, 0.5)
+        non_renewable = 40000 + 2500 * (year - 2000) + rng.normal(0, 800)
+        records.append({
+            'Year': year,
+            'Population (in millions)': population,
+            'Non-Renewable Energy (GWh)': f'{non_renewable:,.1f}',
+            TARGET: 15 * (year - 2000) + 0.01 * non_renewable + rng.normal(0, 20),
+        })
+    return records
+
+
+def frame(records):
+    df = pd.DataFrame(records)
+    df['Non-Renewable Energy (GWh)'] = pd.to_numeric(df['Non-Renewable Energy (GWh)'].str.replace(',', ''))
+    return df
+
+
+class IncrementalOlsTests(SimpleTestCase):
+    def test_insert_update_delete_matches_refit(self):
+        records = make_records(range(2000, 2020))
+        statistics = compute_sufficient_statistics(frame(records), FEATURES, TARGET)
+        origin = statistics[3]
+
+        inserted = make_records([2020], seed=1)
+        updated = make_records([2005], seed=2)
+        deleted = [records[12]]
+        xtx, xty, n_rows = statistics[:3]
+        for added, removed in ((inserted, []), (updated, [records[5]]), ([], deleted)):
+            xtx, xty, n_rows = update_statistics(xtx, xty, n_rows, origin, FEATURES, TARGET, added, removed)
+
+        final = [record for record in records if record is not records[12]]
+        final[5] = updated[0]
+        final += inserted
+        df = frame(final)
+        self.assertEqual(n_rows, len(df))
+
+        # Same accumulators as a refit about the same origin
+        refit_xtx, refit_xty, _, _ = compute_sufficient_statistics(df, FEATURES, TARGET, origin)
+        np.testing.assert_allclose(xtx, refit_xtx, rtol=1e-9)
+        np.testing.assert_allclose(xty, refit_xty, rtol=1e-9)
+
+        # And the same coefficients as a direct least-squares fit of the final data
+        intercept, coef = _solve_ols(xtx, xty, origin)
+        X = np.column_stack([np.ones(len(df)), df[FEATURES].to_numpy(dtype=float)])
+        expected = np.linalg.lstsq(X, df[TARGET].to_numpy(dtype=float), rcond=None)[0]
+        np.testing.assert_allclose(np.append(intercept, coef), expected, rtol=1e-6)
+        np.testing.assert_allclose(X @ np.append(intercept, coef), X @ expected, atol=1e-6)
+
+    def test_incomplete_record_is_rejected(self):
+        records = make_records(range(2000, 2010))
+        xtx, xty, n_rows, origin = compute_sufficient_statistics(frame(records), FEATURES, TARGET)
+        incomplete = dict(make_records([2010])[0], **{'Population (in millions)': None})
+        self.assertIsNone(update_statistics(xtx, xty, n_rows, origin, FEATURES, TARGET, added=[incomplete]))
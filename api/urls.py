@@ -1,9 +1,14 @@
 from django.urls import path
 from .views import (
     get_renewable_energy_predictions, 
+    get_all_renewable_energy_predictions,
     peertopeer_predictions, 
     solar_recommendations, 
+    solar_recommendations_batch,
+    solar_cashflow,
+    score_portfolio_view,
     CreateView, 
+    BulkCreateView,
     update_record, 
     delete_record, 
     recover_record, 
@@ -12,14 +17,21 @@ from .views import (
     peertopeer_record_detail,
     add_recommendation,
     recommendation_record_detail,
-    train_models
+    train_models,
+    train_models_status,
+    mongo_pool_stats
 )
 
 urlpatterns = [
+    path('predictions/', get_all_renewable_energy_predictions, name='get_all_predictions'),
     path('predictions/<str:target>/', get_renewable_energy_predictions, name='get_predictions'),
     path('peertopeer/', peertopeer_predictions, name='peertopeer_predictions'),
     path('solar_recommendations/', solar_recommendations, name='solar_recommendations'),
+    path('solar_recommendations/batch/', solar_recommendations_batch, name='solar_recommendations_batch'),
+    path('solar_recommendations/cashflow/', solar_cashflow, name='solar_cashflow'),
+    path('solar_recommendations/portfolio/', score_portfolio_view, name='score_portfolio'),
     path('create/', CreateView.as_view(), name='insert_actual_data'),
+    path('create/bulk/', BulkCreateView.as_view(), name='bulk_insert_actual_data'),
     path('create/peertopeer/', CreateViewPeertoPeer.as_view(), name='insert_actual_data'),
     path('update/<int:year>/', update_record, name='update_record'),
     path('delete/<int:year>/', delete_record, name='delete_record'),
@@ -28,5 +40,7 @@ urlpatterns = [
     path('peertopeer/records/<str:record_id>', peertopeer_record_detail, name='peertopeer_record_detail'),
     path('add/recommendations', add_recommendation, name='recommendation_records'),
     path('add/recommendations/<str:record_id>', recommendation_record_detail, name='recommendation_record_detail'),
-    path('train_models/', train_models, name='train_models')
+    path('train_models/', train_models, name='train_models'),
+    path('train_models/status/<str:job_id>', train_models_status, name='train_models_status'),
+    path('health/mongo/', mongo_pool_stats, name='mongo_pool_stats')
 ]
\ No newline at end of file
@@ -1,17 +1,23 @@
 # filepath: /d:/TUP/ECOPULSE/backend/api/views.py
-from django.http import JsonResponse
 from django.views.decorators.http import require_GET
-from linearregression_predictiveanalysis import get_predictions, create, connect_to_mongodb  # Import the function here
-from peertopeer import get_peer_to_predictions, createPeertoPeer, connect_to_mongodb_peertopeer
-from recommendations import get_solar_recommendations, recommendation_records, connect_to_mongodb_recommendation
+from linearregression_predictiveanalysis import get_predictions, get_all_predictions, get_materialized_predictions, get_predictions_columnar, TARGETS, create, connect_to_mongodb, COLLECTION_NAME, ACTIVE_FILTER, update_models_for_change, create_many  # Import the function here
+from peertopeer import get_peer_to_cube, createPeertoPeer, connect_to_mongodb_peertopeer, mark_dataset_changed, subgrids, ENERGY_TYPES
+from recommendations import get_solar_recommendations, evaluate_solar_grid, simulate_payback, find_best_investment_year, score_portfolio, MAX_MONTE_CARLO_DRAWS, DEFAULT_MONTE_CARLO_DRAWS, SOLAR_SYSTEM_LIFETIME_YEARS, recommendation_records, connect_to_mongodb_recommendation
 import logging
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
+import csv
 import json
+import time
+import numpy as np
 from django.views.decorators.http import require_http_methods
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from mongodb import get_pool_stats, bump_dataset_version
+from training_jobs import enqueue_retrain, get_job
+from .responses import json_response, parse_format, wants_stream, stream_cursor, stream_documents
+from .pagination import is_paginated, parse_fields, fetch_page
 
 # Configure the logger
 logging.basicConfig(level=logging.DEBUG)
@@ -37,8 +43,28 @@ def get_renewable_energy_predictions(request, target):
         # Log the request parameters
         logger.debug(f"Received request for target: {target}, start_year: {start_year}, end_year: {end_year}")
         
-        # Get predictions for the specified target
-        predictions = get_predictions(target, start_year, end_year)
+        try:
+            layout = parse_format(request)
+        except ValueError as e:
+            return json_response({'status': 'error', 'message': str(e)}, status=400)
+        
+        # One array per field, computed straight from the model arrays
+        if layout == 'columnar':
+            return json_response({
+                'status': 'success',
+                'target': target,
+                'format': 'columnar',
+                'predictions': get_predictions_columnar(target, start_year, end_year)
+            })
+        
+        # Slice the materialized forecast table, computing live only if it does not cover the request
+        try:
+            predictions = get_materialized_predictions(target, start_year, end_year)
+        except Exception as table_error:
+            logger.error(f"Error reading materialized forecasts: {table_error}")
+            predictions = None
+        if predictions is None:
+            predictions = get_predictions(target, start_year, end_year)
         
         # Check if predictions is a DataFrame (old format) or list (new format)
         if hasattr(predictions, 'to_dict'):
@@ -48,7 +74,7 @@ def get_renewable_energy_predictions(request, target):
             # It's already a list of dictionaries
             predictions_dict = predictions
         
-        return JsonResponse({
+        return json_response({
             'status': 'success',
             'target': target,
             'predictions': predictions_dict
@@ -58,60 +84,159 @@ def get_renewable_energy_predictions(request, target):
         # Try to get just the database records without predictions
         try:
             collection = connect_to_mongodb()
-            query = {"Year": {"$gte": start_year, "$lte": end_year}}
-            data = list(collection.find(query))
-            
-            # Process data for the response
-            processed_data = []
-            for item in data:
-                if '_id' in item:
-                    # Convert ObjectId to string
-                    item['_id'] = str(item['_id'])
-                processed_data.append(item)
-                
-            return JsonResponse({
+            query = {"Year": {"$gte": start_year, "$lte": end_year}, **ACTIVE_FILTER}
+            data = list(collection.find(query).sort('Year', 1))
+            
+            return json_response({
                 'status': 'partial_success',
                 'message': 'Error in prediction model, returning available database records',
                 'target': target,
-                'predictions': processed_data
+                'predictions': data
             })
         except Exception as inner_e:
-            return JsonResponse({
+            return json_response({
                 'status': 'error',
                 'message': f"Original error: {str(e)}. Database fallback error: {str(inner_e)}"
             }, status=500)
 
+@require_GET
+def get_all_renewable_energy_predictions(request):
+    """
+    API endpoint to get renewable energy predictions for several targets in one response.
+    Accepts an optional comma separated targets parameter; 'all' or no value returns every target.
+    """
+    try:
+        start_year = request.GET.get('start_year', None)
+        end_year = request.GET.get('end_year', None)
+        if start_year:
+            start_year = int(start_year)
+        else:
+            start_year = 2024  # Default start year if not provided
+        if end_year:
+            end_year = int(end_year)
+        else:
+            end_year = 2040
+
+        available_targets = [target.replace(" (GWh)", "") for target in TARGETS]
+        targets_param = request.GET.get('targets', 'all')
+        if targets_param.lower() == 'all':
+            targets = available_targets
+        else:
+            # Case-insensitive match against the known targets
+            target_lookup = {target.lower(): target for target in available_targets}
+            requested = [target.strip().lower() for target in targets_param.split(',') if target.strip()]
+            unknown = [target for target in requested if target not in target_lookup]
+            if unknown:
+                return json_response({
+                    'status': 'error',
+                    'message': f"Unknown targets: {unknown}. Available targets: {available_targets}"
+                }, status=400)
+            targets = [target_lookup[target] for target in requested]
+
+        logger.debug(f"Received request for targets: {targets}, start_year: {start_year}, end_year: {end_year}")
+
+        predictions = get_all_predictions(start_year, end_year, targets)
+
+        return json_response({
+            'status': 'success',
+            'targets': targets,
+            'predictions': predictions
+        })
+    except Exception as e:
+        logger.error(f"Error in get_all_renewable_energy_predictions: {e}")
+        return json_response({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+def _parse_choices(value, available, name):
+    """
+    Match a comma separated list against the available names, ignoring case and an optional ' (GWh)' suffix.
+    Returns None for no value or 'all'. Raises ValueError listing unknown names.
+    """
+    if not value or value.lower() == 'all':
+        return None
+    lookup = {}
+    for item in available:
+        lookup[item.lower()] = item
+        lookup[item.lower().replace(' (gwh)', '')] = item
+    requested = [item.strip().lower() for item in value.split(',') if item.strip()]
+    unknown = [item for item in requested if item not in lookup]
+    if unknown:
+        raise ValueError(f"Unknown {name}: {unknown}. Available {name}: {list(available)}")
+    return list(dict.fromkeys(lookup[item] for item in requested))
+
+# Largest year x place x energy type cube a single peer-to-peer request may evaluate
+MAX_PEERTOPEER_CUBE_CELLS = 250000
+
 @require_GET
 def peertopeer_predictions(request):
     """
-    API endpoint to get predictions based on year and filters.
+    API endpoint to get predictions for a year range, optionally limited to some places and metrics.
+    Accepts start_year/end_year (or a single year), and comma separated places= and metrics= filters.
     """
     try:
         year = request.GET.get('year')
+        start_year = request.GET.get('start_year') or year
+        end_year = request.GET.get('end_year')
 
-        # Convert year to integer
-        if year:
-            year = int(year)
+        # Convert years to integers
+        if start_year:
+            start_year = int(start_year)
         else:
-            year = 2026  # Default year if not provided
+            start_year = 2026  # Default year if not provided
+        end_year = int(end_year) if end_year else None
+
+        # Split filters into lists; unrequested places and metrics are never fitted
+        try:
+            places = _parse_choices(request.GET.get('places'), subgrids, 'places')
+            energy_types = _parse_choices(request.GET.get('metrics'), ENERGY_TYPES, 'metrics')
+        except ValueError as e:
+            return json_response({'status': 'error', 'message': str(e)}, status=400)
+
+        # The cube is allocated up front, so bound it before building it (end_year defaults as in get_peer_to_cube)
+        last_year = max(end_year if end_year is not None else 2026, start_year)
+        cells = (last_year - start_year + 1) * len(places or subgrids) * len(ENERGY_TYPES)
+        if cells > MAX_PEERTOPEER_CUBE_CELLS:
+            return json_response({
+                'status': 'error',
+                'message': f"Year range {start_year}-{last_year} needs {cells} forecast cells; at most {MAX_PEERTOPEER_CUBE_CELLS} are allowed"
+            }, status=400)
 
-        # Split filters into a list
+        logger.debug(f"Received request for years {start_year}-{end_year}, places: {places}, metrics: {energy_types}")
 
-        logger.debug(f"Received request with year: {year}")
+        try:
+            layout = parse_format(request, allowed=('records', 'columnar', 'nested'))
+        except ValueError as e:
+            return json_response({'status': 'error', 'message': str(e)}, status=400)
 
-        # Get predictions for the specified year and filters
-        predictions = get_peer_to_predictions(year)
+        # Every layout is sliced from the same year x place x energy type cube
+        cube = get_peer_to_cube(start_year, end_year, places, energy_types)
+        
+        # Columnar: one array per field; nested: year -> place -> energy type -> value
+        if layout == 'columnar':
+            return json_response({
+                'status': 'success',
+                'format': 'columnar',
+                'predictions': cube.to_columns()
+            })
+        if layout == 'nested':
+            return json_response({
+                'status': 'success',
+                'format': 'nested',
+                'predictions': cube.to_nested()
+            })
         
         # Convert the DataFrame to a dictionary for JSON response
-        predictions_dict = predictions.to_dict(orient='records')
+        predictions_dict = cube.to_frame().to_dict(orient='records')
         
-        return JsonResponse({
+        return json_response({
             'status': 'success',
             'predictions': predictions_dict
         })
     except Exception as e:
         logger.error(f"Error in peertopeer_predictions: {e}")
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': str(e)}
         , status=500)
@@ -130,16 +255,246 @@ def solar_recommendations(request):
         # Get solar recommendations
         recommendations = get_solar_recommendations(year, budget)
         
-        return JsonResponse({
+        # Payback distribution from a Monte Carlo simulation when uncertainty=true
+        if request.GET.get('uncertainty', '').lower() in ('1', 'true', 'yes'):
+            try:
+                draws = int(request.GET.get('draws', DEFAULT_MONTE_CARLO_DRAWS))
+                seed = int(request.GET['seed']) if request.GET.get('seed') else None
+            except ValueError as e:
+                return json_response({'status': 'error', 'message': str(e)}, status=400)
+            if not 1 <= draws <= MAX_MONTE_CARLO_DRAWS:
+                return json_response({
+                    'status': 'error',
+                    'message': f"draws must be between 1 and {MAX_MONTE_CARLO_DRAWS}"
+                }, status=400)
+            recommendations['uncertainty'] = simulate_payback(budget, year, draws=draws, seed=seed)
+        
+        return json_response({
             'status': 'success',
             'recommendations': recommendations
         })
     except Exception as e:
         logger.error(f"Error in solar_recommendations: {e}")
-        return JsonResponse({
+        return json_response({
+            'status': 'error',
+            'message': str(e)}, status=500)
+
+# Largest budget x year grid a single batch request may evaluate
+MAX_RECOMMENDATION_GRID_CELLS = 250000
+
+def _parse_number_list(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+@require_GET
+def solar_recommendations_batch(request):
+    """
+    API endpoint to evaluate solar recommendations for a whole grid of budgets and years.
+    Budgets come from budgets=a,b,c or budget_min/budget_max/budget_steps (evenly spaced);
+    years from years=a,b,c or start_year/end_year. Returns one flat array per field, years outer.
+    """
+    try:
+        # Parse the grid bounds first and check the cell count before allocating any array
+        try:
+            if request.GET.get('budgets'):
+                budgets = _parse_number_list(request.GET['budgets'], float)
+                budget_count = len(budgets)
+            else:
+                budget_min = float(request.GET.get('budget_min', 0))
+                budget_max = float(request.GET.get('budget_max', budget_min))
+                budget_count = max(int(request.GET.get('budget_steps', 20 if budget_max > budget_min else 1)), 1)
+            if request.GET.get('years'):
+                years = _parse_number_list(request.GET['years'], int)
+                year_count = len(years)
+            else:
+                start_year = int(request.GET.get('start_year', 2026))
+                end_year = max(int(request.GET.get('end_year', start_year)), start_year)
+                year_count = end_year - start_year + 1
+        except ValueError as e:
+            return json_response({'status': 'error', 'message': f"Invalid grid parameter: {e}"}, status=400)
+
+        cells = budget_count * year_count
+        if cells == 0:
+            return json_response({'status': 'error', 'message': 'At least one budget and one year are required'}, status=400)
+        if cells > MAX_RECOMMENDATION_GRID_CELLS:
+            return json_response({
+                'status': 'error',
+                'message': f"Grid has {cells} cells; at most {MAX_RECOMMENDATION_GRID_CELLS} are allowed"
+            }, status=400)
+        if not request.GET.get('budgets'):
+            budgets = np.linspace(budget_min, budget_max, budget_count)
+        if not request.GET.get('years'):
+            years = np.arange(start_year, end_year + 1)
+
+        logger.debug(f"Evaluating solar recommendation grid of {len(years)} years x {len(budgets)} budgets")
+        grid = evaluate_solar_grid(budgets, years)
+
+        return json_response({
+            'status': 'success',
+            'format': 'columnar',
+            'shape': [len(years), len(budgets)],
+            'recommendations': {key: values.ravel() for key, values in grid.items()}
+        })
+    except Exception as e:
+        logger.error(f"Error in solar_recommendations_batch: {e}")
+        return json_response({
+            'status': 'error',
+            'message': str(e)}, status=500)
+
+# Widest investment-year window a cash-flow request may search, longest system life it may simulate,
+# and largest window x (lifetime + 1) cash-flow matrix it may build
+MAX_CASHFLOW_WINDOW_YEARS = 200
+MAX_CASHFLOW_LIFETIME_YEARS = 100
+MAX_CASHFLOW_CELLS = 10000
+
+@require_GET
+def solar_cashflow(request):
+    """
+    API endpoint to simulate the cash flows of a solar investment for every year in a window and
+    find the investment year with the highest NPV. Accepts budget, start_year, end_year and optional
+    lifetime, discount_rate and degradation_rate; include_cash_flows=true adds the yearly cash flows.
+    """
+    try:
+        try:
+            budget = float(request.GET.get('budget', 0))
+            start_year = int(request.GET.get('start_year', 2026))
+            end_year = int(request.GET.get('end_year', start_year + 10))
+            options = {}
+            if request.GET.get('lifetime'):
+                options['lifetime'] = int(request.GET['lifetime'])
+            if request.GET.get('discount_rate'):
+                options['discount_rate'] = float(request.GET['discount_rate'])
+            if request.GET.get('degradation_rate'):
+                options['degradation_rate'] = float(request.GET['degradation_rate'])
+        except ValueError as e:
+            return json_response({'status': 'error', 'message': str(e)}, status=400)
+
+        if end_year < start_year or end_year - start_year + 1 > MAX_CASHFLOW_WINDOW_YEARS:
+            return json_response({
+                'status': 'error',
+                'message': f"end_year must be at or after start_year, at most {MAX_CASHFLOW_WINDOW_YEARS} years apart"
+            }, status=400)
+        lifetime = options.get('lifetime', SOLAR_SYSTEM_LIFETIME_YEARS)
+        if not 1 <= lifetime <= MAX_CASHFLOW_LIFETIME_YEARS or options.get('discount_rate', 0) <= -1:
+            return json_response({
+                'status': 'error',
+                'message': f"lifetime must be between 1 and {MAX_CASHFLOW_LIFETIME_YEARS} years and discount_rate above -1"
+            }, status=400)
+        cells = (end_year - start_year + 1) * (lifetime + 1)
+        if cells > MAX_CASHFLOW_CELLS:
+            return json_response({
+                'status': 'error',
+                'message': f"Simulation has {cells} cash-flow cells; at most {MAX_CASHFLOW_CELLS} are allowed"
+            }, status=400)
+
+        result = find_best_investment_year(budget, start_year, end_year, **options)
+        simulation = result['simulation']
+        cash_flows = simulation.pop('cash_flows')
+        if request.GET.get('include_cash_flows', '').lower() in ('1', 'true', 'yes'):
+            simulation['cash_flows'] = cash_flows
+
+        return json_response({
+            'status': 'success',
+            'format': 'columnar',
+            'best_year': result['best_year'],
+            'best_npv_present': result['best_npv_present'],
+            'simulation': simulation
+        })
+    except Exception as e:
+        logger.error(f"Error in solar_cashflow: {e}")
+        return json_response({
             'status': 'error',
             'message': str(e)}, status=500)
 
+def _decoded_lines(stream):
+    """
+    Yield the lines of an uploaded file or request body as text, one at a time.
+    A line that is not valid UTF-8 yields a ValueError in its place, so one bad line does not end the stream.
+    """
+    for index, line in enumerate(stream):
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError as e:
+            yield ValueError(f"Line {index + 1} is not valid UTF-8: {e}")
+            continue
+        yield text.lstrip('\ufeff') if index == 0 else text
+
+def _csv_rows(lines):
+    """
+    Yield one dictionary per non-blank CSV line, keyed by the header line. Each line is parsed on its
+    own so a malformed line yields a ValueError instead of ending the stream; quoted fields cannot span lines.
+    """
+    header = None
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, Exception):
+            yield line
+            if header is None:
+                # Without a header no later line can be read
+                return
+            continue
+        if not line.strip():
+            continue
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            yield ValueError(f"Line {line_number}: {e}")
+            if header is None:
+                return
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        yield dict(zip(header, values))
+
+def _ndjson_rows(lines):
+    """
+    Yield one parsed object per non-blank line; lines that cannot be decoded or are not valid JSON yield a ValueError.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, Exception):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Line {line_number}: {e}")
+
+@require_http_methods(["POST"])
+@csrf_exempt
+def score_portfolio_view(request):
+    """
+    API endpoint to score a portfolio of households and stream one NDJSON result per household.
+    Accepts a CSV (header with budget, year, subgrid and optional id) or NDJSON body, either raw
+    or as a multipart 'file' upload. The layout is taken from ?format=csv|ndjson, the content type
+    or the file name. Rows are read and scored in chunks, so memory stays bounded.
+    The response has started once rows are read, so lines that cannot be decoded or parsed are
+    reported as 'error' results rather than failing the request.
+    """
+    try:
+        if request.content_type == 'multipart/form-data':
+            upload = request.FILES.get('file')
+            if upload is None:
+                return json_response({'status': 'error', 'message': "Expected a 'file' upload"}, status=400)
+            stream, name, content_type = upload, upload.name or '', upload.content_type or ''
+        else:
+            # Iterating the request reads the body line by line instead of loading it at once
+            stream, name, content_type = request, '', request.content_type or ''
+
+        layout = request.GET.get('format', '').lower()
+        if not layout:
+            layout = 'csv' if 'csv' in content_type or name.lower().endswith('.csv') else 'ndjson'
+        if layout not in ('csv', 'ndjson'):
+            return json_response({'status': 'error', 'message': f"Unsupported format '{layout}'. Supported formats: ['csv', 'ndjson']"}, status=400)
+
+        lines = _decoded_lines(stream)
+        rows = _csv_rows(lines) if layout == 'csv' else _ndjson_rows(lines)
+        logger.debug(f"Scoring {layout} portfolio upload")
+        return stream_documents(score_portfolio(rows))
+    except Exception as e:
+        logger.error(f"Error in score_portfolio_view: {e}")
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class CreateView(View):
     def post(self, request):
@@ -148,29 +503,95 @@ class CreateView(View):
         """
         try:
             data = json.loads(request.body)
-            create(data)
+            try:
+                create(data)
+            except DuplicateKeyError:
+                return json_response({
+                    'status': 'error',
+                    'message': f"A record for Year {data.get('Year')} already exists"
+                }, status=409)
             
-            # Train models after successful data creation
+            # Update the models incrementally or queue a retrain instead of blocking the request on it
             try:
-                from linearregression_predictiveanalysis import train_and_save_models
-                logger.info("Training models after new data creation...")
-                train_result = train_and_save_models()
-                
-                return JsonResponse({
+                model_update = update_models_for_change(added=[data], reason='create')
+                return json_response({
                     'status': 'success', 
-                    'message': 'Data inserted successfully and models trained',
-                    'training_result': train_result
-                })
+                    'message': 'Data inserted successfully and models updated',
+                    **model_update
+                }, status=202 if 'training_job' in model_update else 200)
             except Exception as train_error:
-                logger.error(f"Data inserted but model training failed: {train_error}")
-                return JsonResponse({
+                logger.error(f"Data inserted but models could not be updated: {train_error}")
+                return json_response({
                     'status': 'partial_success',
-                    'message': 'Data inserted successfully but model training failed',
+                    'message': 'Data inserted successfully but models could not be updated',
                     'training_error': str(train_error)
                 })
                 
         except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+            return json_response({'status': 'error', 'message': str(e)}, status=500)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkCreateView(View):
+    def post(self, request):
+        """
+        API endpoint to insert many records from a JSON array or an NDJSON body with one retrain.
+        Query parameters: mode=insert|upsert (upsert matches on Year), ordered=true|false.
+        """
+        try:
+            started = time.perf_counter()
+            upsert = request.GET.get('mode', 'insert').lower() == 'upsert'
+            ordered = request.GET.get('ordered', 'false').lower() in ('1', 'true', 'yes')
+
+            # Parse either a JSON array or one JSON document per line
+            body = request.body.decode('utf-8')
+            parse_errors = {}
+            if 'ndjson' in request.content_type or not body.lstrip().startswith('['):
+                records = []
+                for line_number, line in enumerate(body.splitlines()):
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        parse_errors[len(records)] = f"Line {line_number + 1}: {e}"
+                        records.append(None)
+            else:
+                records = json.loads(body)
+                if not isinstance(records, list):
+                    return json_response({'status': 'error', 'message': 'Expected a JSON array of records'}, status=400)
+
+            results, inserted_documents = create_many(records, upsert=upsert, ordered=ordered)
+            for index, message in parse_errors.items():
+                results[index] = {'index': index, 'status': 'invalid', 'message': message}
+
+            counts = {}
+            for result in results:
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+
+            # At most one model update for the whole batch
+            model_update = {}
+            try:
+                if counts.get('updated'):
+                    model_update = {'model_update': 'retrain_queued', 'training_job': enqueue_retrain('bulk')}
+                elif inserted_documents:
+                    model_update = update_models_for_change(added=inserted_documents, reason='bulk')
+            except Exception as train_error:
+                logger.error(f"Bulk data written but models could not be updated: {train_error}")
+                model_update = {'training_error': str(train_error)}
+
+            elapsed = time.perf_counter() - started
+            written = counts.get('inserted', 0) + counts.get('updated', 0)
+            return json_response({
+                'status': 'success' if written == len(records) else ('partial_success' if written else 'error'),
+                'counts': counts,
+                'results': results,
+                'elapsed_seconds': round(elapsed, 4),
+                'rows_per_second': round(len(records) / elapsed, 1) if elapsed > 0 else None,
+                **model_update
+            }, status=200 if written or not records else 400)
+        except Exception as e:
+            logger.error(f"Error in bulk create: {e}")
+            return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class CreateViewPeertoPeer(View):
@@ -181,9 +602,9 @@ class CreateViewPeertoPeer(View):
         try:
             data = json.loads(request.body)
             createPeertoPeer(data)
-            return JsonResponse({'status': 'success', 'message': 'Data inserted successfully'})
+            return json_response({'status': 'success', 'message': 'Data inserted successfully'})
         except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+            return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 @require_http_methods(["PUT"])
 @csrf_exempt
@@ -199,10 +620,10 @@ def update_record(request, year):
         logger.debug(f"Updating record for Year: {year} with data: {data}")
         
         # Fetch the existing record
-        existing_record = collection.find_one({"Year": int(year)})
+        existing_record = collection.find_one({"Year": int(year), **ACTIVE_FILTER})
         if not existing_record:
             logger.error(f"Record not found for Year: {year}")
-            return JsonResponse({'status': 'error', 'message': 'Record not found'}, status=404)
+            return json_response({'status': 'error', 'message': 'Record not found'}, status=404)
         
         # Calculate the new values for Total Power Generation and Total Renewable Energy
         total_renewable_energy = (
@@ -223,38 +644,40 @@ def update_record(request, year):
         data['Total Power Generation (GWh)'] = total_power_generation
         
         result = collection.update_one(
-            {"Year": int(year)},
+            {"Year": int(year), **ACTIVE_FILTER},
             {"$set": data}
         )
         
         if result.matched_count == 0:
             logger.error(f"Record not found for Year: {year}")
-            return JsonResponse({'status': 'error', 'message': 'Record not found'}, status=404)
+            return json_response({'status': 'error', 'message': 'Record not found'}, status=404)
         
+        bump_dataset_version(COLLECTION_NAME)
         logger.info(f"Record updated successfully for Year: {year}")
         
-        # Train models after successful update
+        # Update the models incrementally or queue a retrain instead of blocking the request on it
         try:
-            from linearregression_predictiveanalysis import train_and_save_models
-            logger.info("Training models after data update...")
-            train_result = train_and_save_models()
-            
-            return JsonResponse({
+            model_update = update_models_for_change(
+                added=[{**existing_record, **data}],
+                removed=[existing_record],
+                reason='update'
+            )
+            return json_response({
                 'status': 'success', 
-                'message': 'Record updated successfully and models trained',
-                'training_result': train_result
-            })
+                'message': 'Record updated successfully and models updated',
+                **model_update
+            }, status=202 if 'training_job' in model_update else 200)
         except Exception as train_error:
-            logger.error(f"Record updated but model training failed: {train_error}")
-            return JsonResponse({
+            logger.error(f"Record updated but models could not be updated: {train_error}")
+            return json_response({
                 'status': 'partial_success',
-                'message': 'Record updated successfully but model training failed',
+                'message': 'Record updated successfully but models could not be updated',
                 'training_error': str(train_error)
             })
             
     except Exception as e:
         logger.error(f"Error updating record: {e}")
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 @require_http_methods(["DELETE"])
 @csrf_exempt
@@ -268,20 +691,29 @@ def delete_record(request, year):
         # Log the year of the record to be soft deleted
         logger.debug(f"Soft deleting record for Year: {year}")
         
-        result = collection.update_one(
+        # Returns the record as it was before the update
+        previous_record = collection.find_one_and_update(
             {"Year": int(year)},
             {"$set": {"isDeleted": True}}
         )
         
-        if result.matched_count == 0:
+        if previous_record is None:
             logger.error(f"Record not found for Year: {year}")
-            return JsonResponse({'status': 'error', 'message': 'Record not found'}, status=404)
+            return json_response({'status': 'error', 'message': 'Record not found'}, status=404)
         
+        bump_dataset_version(COLLECTION_NAME)
         logger.info(f"Record soft deleted successfully for Year: {year}")
-        return JsonResponse({'status': 'success', 'message': 'Record soft deleted successfully'})
+        
+        model_update = {}
+        if not previous_record.get('isDeleted'):
+            try:
+                model_update = update_models_for_change(removed=[previous_record], reason='delete')
+            except Exception as train_error:
+                logger.error(f"Record soft deleted but models could not be updated: {train_error}")
+        return json_response({'status': 'success', 'message': 'Record soft deleted successfully', **model_update})
     except Exception as e:
         logger.error(f"Error soft deleting record: {e}")
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 @require_http_methods(["PUT"])
 @csrf_exempt
@@ -295,20 +727,29 @@ def recover_record(request, year):
         # Log the year of the record to be recovered
         logger.debug(f"Recovering record for Year: {year}")
         
-        result = collection.update_one(
+        # Returns the record as it was before the update
+        previous_record = collection.find_one_and_update(
             {"Year": int(year)},
             {"$set": {"isDeleted": False}}
         )
         
-        if result.matched_count == 0:
+        if previous_record is None:
             logger.error(f"Record not found for Year: {year}")
-            return JsonResponse({'status': 'error', 'message': 'Record not found'}, status=404)
+            return json_response({'status': 'error', 'message': 'Record not found'}, status=404)
         
+        bump_dataset_version(COLLECTION_NAME)
         logger.info(f"Record recovered successfully for Year: {year}")
-        return JsonResponse({'status': 'success', 'message': 'Record recovered successfully'})
+        
+        model_update = {}
+        if previous_record.get('isDeleted'):
+            try:
+                model_update = update_models_for_change(added=[{**previous_record, 'isDeleted': False}], reason='recover')
+            except Exception as train_error:
+                logger.error(f"Record recovered but models could not be updated: {train_error}")
+        return json_response({'status': 'success', 'message': 'Record recovered successfully', **model_update})
     except Exception as e:
         logger.error(f"Error recovering record: {e}")
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 # MongoDB API endpoints for peer-to-peer data
 def peertopeer_records(request):
@@ -337,18 +778,37 @@ def peertopeer_records(request):
                     ]
                 }
             
+            # Only fetch the requested fields
+            projection = parse_fields(request)
+            
+            # Keyset pagination on _id when a limit or next token is given
+            if is_paginated(request):
+                try:
+                    records, next_token = fetch_page(collection, query, request, sort_keys=['_id'], projection=projection)
+                except ValueError as e:
+                    return json_response({'status': 'error', 'message': str(e)}, status=400)
+                if wants_stream(request):
+                    response = stream_documents(records)
+                    response['X-Next-Token'] = next_token or ''
+                    return response
+                return json_response({
+                    'status': 'success',
+                    'records': records,
+                    'next': next_token
+                })
+            
             # Fetch records
-            records_cursor = collection.find(query)
-            records = []
+            records_cursor = collection.find(query, projection)
             
-            # Process each record
-            for record in records_cursor:
-                # Convert ObjectId to string for JSON serialization
-                record['_id'] = str(record['_id'])
-                records.append(record)
+            # Stream the cursor as NDJSON when asked to instead of building the whole list
+            if wants_stream(request):
+                return stream_cursor(records_cursor)
+            
+            # ObjectIds are serialized by json_response
+            records = list(records_cursor)
             
             # Return records as JSON response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'records': records
             })
@@ -359,16 +819,17 @@ def peertopeer_records(request):
             
             # Insert new record
             result = collection.insert_one(data)
+            mark_dataset_changed()
             
             # Return success response with new record ID
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Record created successfully',
                 'id': str(result.inserted_id)
             })
             
         else:
-            return JsonResponse({
+            return json_response({
                 'status': 'error',
                 'message': 'Method not allowed'
             }, status=405)
@@ -379,7 +840,7 @@ def peertopeer_records(request):
         logging.error(f"Error in peertopeer_records: {str(e)}")
         
         # Return error response
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -401,16 +862,13 @@ def peertopeer_record_detail(request, record_id):
             record = collection.find_one({'_id': object_id})
             
             if not record:
-                return JsonResponse({
+                return json_response({
                     'status': 'error',
                     'message': 'Record not found'
                 }, status=404)
                 
-            # Convert ObjectId to string for JSON serialization
-            record['_id'] = str(record['_id'])
-            
             # Return record as JSON response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'record': record
             })
@@ -433,13 +891,15 @@ def peertopeer_record_detail(request, record_id):
             result = collection.update_one({'_id': object_id}, {'$set': data})
             
             if result.matched_count == 0:
-                return JsonResponse({
+                return json_response({
                     'status': 'error',
                     'message': 'Record not found'
                 }, status=404)
+            if result.modified_count:
+                mark_dataset_changed()
                 
             # Return success response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Record updated successfully'
             })
@@ -449,19 +909,20 @@ def peertopeer_record_detail(request, record_id):
             result = collection.delete_one({'_id': object_id})
             
             if result.deleted_count == 0:
-                return JsonResponse({
+                return json_response({
                     'status': 'error',
                     'message': 'Record not found'
                 }, status=404)
+            mark_dataset_changed()
                 
             # Return success response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Record deleted successfully'
             })
             
         else:
-            return JsonResponse({
+            return json_response({
                 'status': 'error',
                 'message': 'Method not allowed'
             }, status=405)
@@ -473,7 +934,7 @@ def peertopeer_record_detail(request, record_id):
         logger.error(f"Request headers: {request.headers}")
         
         # Return error response
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -495,17 +956,36 @@ def add_recommendation(request):
             if year:
                 query["Year"] = int(year)
             
+            # Only fetch the requested fields
+            projection = parse_fields(request)
+            
+            # Keyset pagination on (Year, _id) when a limit or next token is given
+            if is_paginated(request):
+                try:
+                    records, next_token = fetch_page(collection, query, request, sort_keys=['Year', '_id'], projection=projection)
+                except ValueError as e:
+                    return json_response({'status': 'error', 'message': str(e)}, status=400)
+                if wants_stream(request):
+                    response = stream_documents(records)
+                    response['X-Next-Token'] = next_token or ''
+                    return response
+                return json_response({
+                    'status': 'success',
+                    'records': records,
+                    'next': next_token
+                })
+            
             # Fetch records
-            records_cursor = collection.find(query)
-            records = []
+            records_cursor = collection.find(query, projection)
+            
+            # Stream the cursor as NDJSON when asked to instead of building the whole list
+            if wants_stream(request):
+                return stream_cursor(records_cursor)
             
-            # Process each record
-            for record in records_cursor:
-                # Convert ObjectId to string for JSON serialization
-                record['_id'] = str(record['_id'])
-                records.append(record)
+            # ObjectIds are serialized by json_response
+            records = list(records_cursor)
             
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'records': records
             })
@@ -522,14 +1002,14 @@ def add_recommendation(request):
             result = collection.insert_one(data)
             
             # Return success response with new record ID
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Recommendation created successfully',
                 'id': str(result.inserted_id)
             })
             
         else:
-            return JsonResponse({
+            return json_response({
                 'status': 'error',
                 'message': 'Method not allowed'
             }, status=405)
@@ -539,7 +1019,7 @@ def add_recommendation(request):
         logger.error(f"Error in recommendation_records: {str(e)}")
         
         # Return error response
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -561,16 +1041,13 @@ def recommendation_record_detail(request, record_id):
             record = collection.find_one({'_id': object_id})
             
             if not record:
-                return JsonResponse({
+                return json_response({
                     'status': 'error',
                     'message': 'Recommendation record not found'
                 }, status=404)
                 
-            # Convert ObjectId to string for JSON serialization
-            record['_id'] = str(record['_id'])
-            
             # Return record as JSON response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'record': record
             })
@@ -595,13 +1072,13 @@ def recommendation_record_detail(request, record_id):
             result = collection.update_one({'_id': object_id}, {'$set': data})
             
             if result.matched_count == 0:
-                return JsonResponse({
+                return json_response({
                     'status': 'error',
                     'message': 'Recommendation record not found'
                 }, status=404)
                 
             # Return success response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Recommendation record updated successfully'
             })
@@ -611,19 +1088,19 @@ def recommendation_record_detail(request, record_id):
             result = collection.delete_one({'_id': object_id})
             
             if result.deleted_count == 0:
-                return JsonResponse({
+                return json_response({
                     'status': 'error',
                     'message': 'Recommendation record not found'
                 }, status=404)
                 
             # Return success response
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Recommendation record deleted successfully'
             })
             
         else:
-            return JsonResponse({
+            return json_response({
                 'status': 'error',
                 'message': 'Method not allowed'
             }, status=405)
@@ -633,7 +1110,7 @@ def recommendation_record_detail(request, record_id):
         logger.error(f"Error in recommendation_record_detail: {str(e)}")
         
         # Return error response
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': str(e)}
         , status=500)
@@ -643,20 +1120,69 @@ def recommendation_record_detail(request, record_id):
 def train_models(request):
     """
     API endpoint to train and save machine learning models for prediction.
+    With ?async=true the training is queued and the job is returned immediately.
     """
     try:
+        if request.GET.get('async', '').lower() in ('1', 'true', 'yes'):
+            training_job = enqueue_retrain('manual')
+            return json_response({
+                'status': 'success',
+                'message': 'Model training queued',
+                'training_job': training_job
+            }, status=202)
+
         from linearregression_predictiveanalysis import train_and_save_models
         
         result = train_and_save_models()
         
-        return JsonResponse({
+        return json_response({
             'status': 'success',
             'message': 'Models trained and saved successfully',
             'models': result
         })
     except Exception as e:
         logger.error(f"Error in train_models: {e}")
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': f"Error training models: {str(e)}"
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+@require_GET
+def train_models_status(request, job_id):
+    """
+    API endpoint to report the progress and resulting model version of a training job.
+    """
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return json_response({
+                'status': 'error',
+                'message': 'Training job not found'
+            }, status=404)
+        return json_response({
+            'status': 'success',
+            'job': job
+        })
+    except Exception as e:
+        logger.error(f"Error in train_models_status: {e}")
+        return json_response({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+@require_GET
+def mongo_pool_stats(request):
+    """
+    API endpoint to report the shared MongoDB client and connection pool counters for this worker.
+    """
+    try:
+        return json_response({
+            'status': 'success',
+            'pool': get_pool_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error in mongo_pool_stats: {e}")
+        return json_response({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
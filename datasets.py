@@ -0,0 +1,158 @@
+import os
+import json
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from fileio import atomic_write
+
+# Configure the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the cache layout changes so old caches are rebuilt
+DATASET_CACHE_FORMAT = 2
+# Directory holding the converted workbooks; defaults to next to each source file
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR")
+
+# Source path -> (source stamp, DataFrame) for workbooks already loaded in this process
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def source_stamp(path):
+    """
+    Return the (mtime in nanoseconds, size) pair identifying the current contents of a file.
+    """
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def to_float(value):
+    """
+    Convert a record field to float, accepting numbers stored as strings with thousands separators.
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+        if not value:
+            return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _cache_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(DATASET_CACHE_DIR or directory, f'.{name}.cache.npz')
+
+def _column_arrays(values):
+    """
+    Return the arrays storing one column without pickling: the values, plus a missing-value mask for text.
+    Object columns are stored as numbers when every value parses as one, and as text when every
+    value is a string or missing. Raises ValueError for columns mixing text with other values.
+    """
+    if values.dtype != object:
+        return values, None
+    missing = pd.isna(values)
+    try:
+        return np.asarray(pd.to_numeric(values)), None
+    except (TypeError, ValueError):
+        pass
+    if not all(isinstance(value, str) for value in values[~missing]):
+        raise ValueError("column mixes text with other values")
+    return np.where(missing, '', values).astype(str), missing
+
+def _encode_frame(df, stamp):
+    """
+    Return the arrays and JSON header holding a DataFrame in the cache.
+    """
+    arrays = {}
+    for i, column in enumerate(df.columns):
+        try:
+            values, missing = _column_arrays(df[column].to_numpy())
+        except ValueError as e:
+            raise ValueError(f"Cannot cache column {column!r}: {e}")
+        arrays[f'column_{i}'] = values
+        if missing is not None:
+            arrays[f'missing_{i}'] = missing
+    header = {'format': DATASET_CACHE_FORMAT, 'stamp': list(stamp), 'columns': [str(column) for column in df.columns]}
+    arrays['header'] = np.array(json.dumps(header))
+    return arrays
+
+def _decode_frame(arrays, columns):
+    """
+    Rebuild a DataFrame from its cache arrays; text columns get their missing values back as NaN.
+    """
+    data = {}
+    for i, column in enumerate(columns):
+        values = arrays[f'column_{i}']
+        if f'missing_{i}' in arrays:
+            values = values.astype(object)
+            values[arrays[f'missing_{i}']] = np.nan
+        data[column] = values
+    return pd.DataFrame(data)
+
+def _write_cache(cache_path, arrays):
+    """
+    Write the cache arrays atomically so workers never read a partial cache.
+    """
+    def write(tmp_path):
+        # Write through a file object; np.savez would append .npz to a path
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    atomic_write(cache_path, write)
+
+def _read_cache(cache_path, stamp):
+    """
+    Return the cached DataFrame, or None if the cache is missing or was built from another version of the source.
+    """
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            if header.get('format') != DATASET_CACHE_FORMAT or tuple(header.get('stamp', ())) != tuple(stamp):
+                return None
+            return _decode_frame(data, header['columns'])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable dataset cache {cache_path}: {e}")
+        return None
+
+def load_excel_dataset_versioned(path):
+    """
+    Return the (source stamp, DataFrame) of an Excel workbook.
+    The workbook is parsed once and converted to a binary columnar cache keyed by its mtime and size;
+    later loads, including in other workers, read the cache instead. Edits to the workbook change
+    the stamp, so the next call re-parses it. Callers must treat the returned DataFrame as read-only.
+    """
+    stamp = source_stamp(path)
+    with _loaded_lock:
+        loaded = _loaded.get(path)
+        if loaded is not None and loaded[0] == stamp:
+            return loaded
+
+        cache_path = _cache_path(path)
+        df = _read_cache(cache_path, stamp)
+        if df is None:
+            logger.info(f"Converting {path} to a dataset cache")
+            df = pd.read_excel(path)
+            try:
+                arrays = _encode_frame(df, stamp)
+            except ValueError as e:
+                logger.warning(f"Not caching {path}: {e}")
+            else:
+                # Serve the decoded frame so this worker sees the same dtypes as workers reading the cache
+                df = _decode_frame(arrays, json.loads(str(arrays['header']))['columns'])
+                try:
+                    _write_cache(cache_path, arrays)
+                except OSError as e:
+                    logger.warning(f"Could not write dataset cache {cache_path}: {e}")
+        _loaded[path] = (stamp, df)
+        return _loaded[path]
+
+def load_excel_dataset(path):
+    """
+    Return the DataFrame of an Excel workbook, read through the dataset cache.
+    """
+    return load_excel_dataset_versioned(path)[1]
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import logging
+from contextlib import contextmanager
+
+# fcntl is not available on Windows; locks then only cover the current process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Configure the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Mode of every artifact written here; workers may run as a different user than the writer
+ARTIFACT_MODE = 0o644
+
+def atomic_write(path, write):
+    """
+    Call write(tmp_path) and rename the result over path so readers never see a half-written file.
+    The temporary file is created in the same directory so the rename stays on one filesystem.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp creates owner-only files; artifacts are read by every worker
+        os.chmod(tmp_path, ARTIFACT_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on path for the duration of the block, blocking until it is free.
+    The lock is shared by every process that opens the same file, so it serializes
+    read-modify-write cycles between workers. The file is created if needed and left in place.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            logger.warning(f"File locks are not supported on this platform; {path} only guards this process")
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
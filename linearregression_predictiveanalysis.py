@@ -2,16 +2,23 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 import joblib
 import logging
-from pymongo import MongoClient
-from dotenv import load_dotenv
-from pymongo.errors import ConnectionFailure
+import json
+import struct
+import threading
+import copy
 import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure, BulkWriteError
+from datasets import to_float
+from fileio import atomic_write, file_lock
+from mongodb import get_collection, get_dataset_version, bump_dataset_version, DATASET_VERSION_CHECK_INTERVAL
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,31 +27,80 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-MONGO_URI = os.getenv("MONGO_URI")  # Load MongoDB URI from environment variables
-DATABASE_NAME = "ecopulse"  # Replace with your database name
+# MongoDB connection (client and URI are shared through mongodb.py)
 COLLECTION_NAME = "predictiveAnalysis"  # Replace with your collection name
 
+# Filter matching records that are not soft deleted; older records without an isDeleted flag count as active
+ACTIVE_FILTER = {'isDeleted': {'$ne': True}}
+
+# Fields stored as numbers, possibly written as strings with thousands separators
+NUMERIC_COLUMNS = [
+    "Total Renewable Energy (GWh)",
+    "Geothermal (GWh)",
+    "Hydro (GWh)",
+    "Biomass (GWh)",
+    "Solar (GWh)",
+    "Wind (GWh)",
+    "Non-Renewable Energy (GWh)",
+    "Total Power Generation (GWh)",
+    "Population (in millions)",
+    "Gross Domestic Product"
+]
+
+# Model inputs and the renewable targets a model is trained for
+FEATURES = ['Year', 'Population (in millions)', 'Non-Renewable Energy (GWh)']
+TARGETS = ['Geothermal (GWh)', 'Hydro (GWh)', 'Biomass (GWh)', 'Solar (GWh)', 'Wind (GWh)']
+
+# Processes used to train targets in parallel; 0 uses one per target up to the CPU count, 1 trains in-process
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "0"))
+# 'per_target' fits one regression per target, 'multioutput' fits every target on one shared design matrix
+TRAINING_MODE = os.getenv("TRAINING_MODE", "per_target")
+# 'full' refits every model on each change, 'incremental' updates them from stored XᵀX / Xᵀy accumulators
+MODEL_MODE = os.getenv("MODEL_MODE", "full")
+# Lock file serializing updates of the stored accumulators between worker processes
+INCREMENTAL_LOCK_PATH = os.getenv("INCREMENTAL_LOCK_PATH", "models.ols.lock")
+# Largest relative coefficient difference between incremental and refitted models that is not reported as drift
+INCREMENTAL_TOLERANCE = float(os.getenv("INCREMENTAL_TOLERANCE", "1e-6"))
+
+# Compact model bundle holding every target's coefficients, read through a memory map
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH", "models.bundle")
+MODEL_BUNDLE_MAGIC = b'ECOPMDL1'
+
+# Materialized forecast table written at training time, and the document describing the current build
+FORECASTS_COLLECTION = "forecasts"
+FORECASTS_META_COLLECTION = "forecastsMeta"
+# Last year materialized for every target
+FORECAST_HORIZON_END_YEAR = int(os.getenv("FORECAST_HORIZON_END_YEAR", "2040"))
+
 def connect_to_mongodb(retries=3, delay=5):
     """
-    Connect to MongoDB Atlas and return the collection.
+    Return the collection from the process-wide pooled MongoDB client.
     Retries the connection in case of failure.
     """
-    for attempt in range(retries):
-        try:
-            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-            db = client[DATABASE_NAME]
-            collection = db[COLLECTION_NAME]
-            # Attempt to ping the server to check the connection
-            client.admin.command('ping')
-            logger.debug("Connected to MongoDB Atlas successfully.")
-            return collection
-        except ConnectionFailure as e:
-            logger.error(f"Error connecting to MongoDB (attempt {attempt + 1}): {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                raise
+    return get_collection(COLLECTION_NAME, retries=retries, delay=delay)
+
+def ensure_indexes(retries=1):
+    """
+    Create the predictiveAnalysis indexes: a unique index on Year for lookups by year and a
+    (Year, isDeleted) index for the read paths, which filter out soft-deleted records.
+    Run through the ensure_mongo_indexes management command; safe to run repeatedly.
+    Raises OperationFailure if an index cannot be created, for example because of duplicate years.
+    """
+    collection = connect_to_mongodb(retries=retries)
+    # Give older records an explicit flag; reads treat a missing flag as not deleted either way
+    result = collection.update_many({'isDeleted': {'$exists': False}}, {'$set': {'isDeleted': False}})
+    if result.modified_count:
+        logger.info(f"Marked {result.modified_count} records as not deleted")
+        bump_dataset_version(COLLECTION_NAME)
+    try:
+        collection.create_index([('Year', ASCENDING)], unique=True, name='Year_unique')
+    except OperationFailure as e:
+        logger.error(f"Could not create unique Year index (duplicate years?): {e}")
+        raise
+    # The earlier partial index only covered isDeleted: false, which ACTIVE_FILTER queries cannot use
+    if 'Year_active' in collection.index_information():
+        collection.drop_index('Year_active')
+    collection.create_index([('Year', ASCENDING), ('isDeleted', ASCENDING)], name='Year_isDeleted')
 
 def create(data):
     """
@@ -54,47 +110,161 @@ def create(data):
         collection = connect_to_mongodb()
         # Add the isPredicted flag for actual data
         data['isPredicted'] = False
+        # New records carry an explicit active flag
+        data.setdefault('isDeleted', False)
         collection.insert_one(data)
+        bump_dataset_version(COLLECTION_NAME)
         logger.info("Actual data inserted successfully.")
     except Exception as e:
         logger.error(f"Error inserting actual data: {e}")
         raise
 
-def load_and_preprocess_data():
+def normalize_record(record):
     """
-    Load the dataset from MongoDB and preprocess it by handling missing values.
+    Validate a record and return a copy ready to be stored.
+    Year becomes an int and numeric fields become floats; raises ValueError naming the bad field.
     """
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a JSON object")
+    normalized = dict(record)
+    normalized.pop('_id', None)
     try:
-        collection = connect_to_mongodb()
-        # Fetch all documents from the collection
-        data = list(collection.find({}))
-        logger.debug(f"Fetched data: {data}")  # Add detailed logging
-        # Convert the data to a pandas DataFrame
-        df = pd.DataFrame(data)
-        # Convert numeric fields from strings to numbers
-        numeric_columns = [
-            "Total Renewable Energy (GWh)",
-            "Geothermal (GWh)",
-            "Hydro (GWh)",
-            "Biomass (GWh)",
-            "Solar (GWh)",
-            "Wind (GWh)",
-            "Non-Renewable Energy (GWh)",
-            "Total Power Generation (GWh)",
-            "Population (in millions)",
-            "Gross Domestic Product"
+        normalized['Year'] = int(normalized['Year'])
+    except KeyError:
+        raise ValueError("Missing field: Year")
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid Year: {record.get('Year')!r}")
+    for col in NUMERIC_COLUMNS:
+        if col in normalized and normalized[col] is not None:
+            value = to_float(normalized[col])
+            if np.isnan(value) and normalized[col] != '':
+                raise ValueError(f"Invalid number for {col}: {normalized[col]!r}")
+            normalized[col] = None if np.isnan(value) else value
+    normalized['isPredicted'] = False
+    normalized.setdefault('isDeleted', False)
+    return normalized
+
+def create_many(records, upsert=False, ordered=False):
+    """
+    Validate and write many records in one round trip.
+    Inserts with insert_many, or upserts by Year with bulk_write when upsert is True.
+    Upserts update the fields of an existing year but leave its soft-delete flag alone; deleted
+    records are restored only through the recover endpoint.
+    Returns (results, written_documents): one result per input record with its status
+    ('inserted', 'updated', 'invalid', 'error' or 'skipped'), and the documents that were
+    inserted (as opposed to updated).
+    """
+    results = [None] * len(records)
+    documents = []
+    positions = []
+    for index, record in enumerate(records):
+        try:
+            documents.append(normalize_record(record))
+            positions.append(index)
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'invalid', 'message': str(e)}
+            if ordered:
+                break
+
+    # Records after an invalid one in an ordered batch are not attempted
+    for index in range(positions[-1] + 1 if positions else 0, len(records)):
+        if results[index] is None:
+            results[index] = {'index': index, 'status': 'skipped'}
+    if not documents:
+        return results, []
+
+    collection = connect_to_mongodb()
+    errors = {}
+    if upsert:
+        # isDeleted is only written for new documents, so re-posting a soft-deleted year does not restore it
+        operations = [
+            UpdateOne(
+                {'Year': doc['Year']},
+                {
+                    '$set': {key: value for key, value in doc.items() if key != 'isDeleted'},
+                    '$setOnInsert': {'isDeleted': doc['isDeleted']}
+                },
+                upsert=True
+            )
+            for doc in documents
         ]
-        for col in numeric_columns:
-            if df[col].dtype == 'object':
-                df[col] = pd.to_numeric(df[col].str.replace(",", ""), errors="coerce")
-        # Forward fill missing values
-        df = df.ffill()  # Use ffill() instead of fillna(method="ffill")
-        # Ensure coordinates are included
-        if 'Latitude' in df.columns and 'Longitude' in df.columns:
-            df['coordinates'] = df.apply(lambda row: {'lat': row['Latitude'], 'lng': row['Longitude']}, axis=1)
+        try:
+            upserted = collection.bulk_write(operations, ordered=ordered).upserted_ids
+        except BulkWriteError as e:
+            upserted = {item['index']: item['_id'] for item in e.details.get('upserted', [])}
+            errors = {error['index']: error['errmsg'] for error in e.details.get('writeErrors', [])}
+    else:
+        upserted = None
+        try:
+            collection.insert_many(documents, ordered=ordered)
+        except BulkWriteError as e:
+            errors = {error['index']: error['errmsg'] for error in e.details.get('writeErrors', [])}
+
+    first_error = min(errors) if errors else None
+    inserted_documents = []
+    for position, (index, doc) in enumerate(zip(positions, documents)):
+        if position in errors:
+            results[index] = {'index': index, 'Year': doc['Year'], 'status': 'error', 'message': errors[position]}
+        elif ordered and first_error is not None and position > first_error:
+            results[index] = {'index': index, 'Year': doc['Year'], 'status': 'skipped'}
+        elif upserted is not None and position not in upserted:
+            results[index] = {'index': index, 'Year': doc['Year'], 'status': 'updated'}
         else:
-            df['coordinates'] = None
-        return df
+            if upserted is not None:
+                doc['_id'] = upserted[position]
+            results[index] = {'index': index, 'Year': doc['Year'], 'status': 'inserted', 'id': str(doc.get('_id'))}
+            inserted_documents.append(doc)
+
+    if any(result['status'] in ('inserted', 'updated') for result in results):
+        bump_dataset_version(COLLECTION_NAME)
+    return results, inserted_documents
+
+# Preprocessed dataset cache: (dataset version, DataFrame, statistics derived from it)
+_dataset_cache = (None, None, {})
+_dataset_cache_lock = threading.Lock()
+
+def _read_and_preprocess_data():
+    """
+    Read the whole collection from MongoDB and preprocess it by handling missing values.
+    """
+    collection = connect_to_mongodb()
+    # Fetch every record that is not soft deleted, in year order
+    data = list(collection.find(ACTIVE_FILTER).sort('Year', ASCENDING))
+    logger.debug(f"Fetched {len(data)} documents")
+    # Convert the data to a pandas DataFrame
+    df = pd.DataFrame(data)
+    # Convert numeric fields from strings to numbers
+    for col in NUMERIC_COLUMNS:
+        if df[col].dtype == 'object':
+            df[col] = pd.to_numeric(df[col].str.replace(",", ""), errors="coerce")
+    # Forward fill missing values
+    df = df.ffill()  # Use ffill() instead of fillna(method="ffill")
+    # Ensure coordinates are included
+    if 'Latitude' in df.columns and 'Longitude' in df.columns:
+        df['coordinates'] = [{'lat': lat, 'lng': lng} for lat, lng in zip(df['Latitude'], df['Longitude'])]
+    else:
+        df['coordinates'] = None
+    return df
+
+def load_and_preprocess_data():
+    """
+    Return the preprocessed dataset, reading MongoDB only when the dataset version has changed.
+    The returned DataFrame is shared between requests and must be treated as read-only.
+    """
+    global _dataset_cache
+    try:
+        version = get_dataset_version(COLLECTION_NAME)
+        cached_version, cached_df, _ = _dataset_cache
+        if cached_df is not None and cached_version == version:
+            return cached_df
+        with _dataset_cache_lock:
+            cached_version, cached_df, _ = _dataset_cache
+            if cached_df is not None and cached_version == version:
+                return cached_df
+            df = _read_and_preprocess_data()
+            _dataset_cache = (version, df, {})
+            logger.info(f"Loaded {len(df)} rows for dataset version {version}")
+            return df
     except Exception as e:
         logger.error(f"Error loading and preprocessing data: {e}")
         raise
@@ -103,6 +273,10 @@ def train_model(df, features, target):
     """
     Train a linear regression model for a given target variable.
     """
+    # scikit-learn is only needed for training, so it is imported here to keep inference start-up light
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
     X = df[features]
     y = df[target]
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -114,25 +288,322 @@ def train_model(df, features, target):
     print(f'\nModel Evaluation for {target}:\nMean Absolute Error (MAE): {mae}\nMean Squared Error (MSE): {mse}')
     return model
 
+def train_multioutput_model(df, features, targets):
+    """
+    Train one linear regression for every target on a shared design matrix and train/test split.
+    Returns a dictionary of single-target models so each one can be saved and served as before.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    X = df[features]
+    Y = df[targets]
+    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
+    model = LinearRegression()
+    model.fit(X_train, Y_train)
+    Y_pred = model.predict(X_test)
+    models = {}
+    for j, target in enumerate(targets):
+        mae = mean_absolute_error(Y_test[target], Y_pred[:, j])
+        mse = mean_squared_error(Y_test[target], Y_pred[:, j])
+        logger.info(f"Model evaluation for {target}: MAE {mae}, MSE {mse}")
+        # Slice the shared fit into an ordinary single-target model
+        target_model = copy.deepcopy(model)
+        target_model.coef_ = model.coef_[j]
+        target_model.intercept_ = model.intercept_[j]
+        models[target] = target_model
+    return models
+
+def _train_and_save_target(df, features, target):
+    """
+    Train and save the model for one target. Runs in a training worker process.
+    """
+    model = train_model(df, features, target)
+    model_path = f'{target.replace(" ", "_").lower()}_model.pkl'
+    save_model(model, model_path)
+    logger.info(f"Saved model to {model_path}")
+    return model
+
+# Worker pool reused across retrains so process start-up is paid once
+_training_pool = None
+_training_pool_lock = threading.Lock()
+
+def _reset_training_pool_after_fork():
+    global _training_pool, _training_pool_lock
+    _training_pool = None
+    _training_pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_training_pool_after_fork)
+
+def _get_training_pool(workers):
+    """
+    Return the shared training process pool, creating it on first use.
+    Workers are spawned rather than forked because the web process runs other threads.
+    """
+    global _training_pool
+    with _training_pool_lock:
+        if _training_pool is None:
+            _training_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _training_pool
+
+def _discard_training_pool(pool):
+    """
+    Shut down a broken training pool so the next call to _get_training_pool builds a new one.
+    """
+    global _training_pool
+    with _training_pool_lock:
+        if _training_pool is pool:
+            _training_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def train_all_models(df, features, targets, progress=None):
+    """
+    Train and save the model for every target, in parallel when more than one worker is configured.
+    Returns a dictionary mapping each target to its fitted model or the exception it raised.
+    """
+    results = {}
+
+    if TRAINING_MODE == 'multioutput':
+        logger.info(f"Training one multi-output model for {len(targets)} targets...")
+        models = train_multioutput_model(df, features, targets)
+        for index, target in enumerate(targets):
+            try:
+                model_path = f'{target.replace(" ", "_").lower()}_model.pkl'
+                save_model(models[target], model_path)
+                logger.info(f"Saved model to {model_path}")
+                results[target] = models[target]
+            except Exception as e:
+                results[target] = e
+            if progress is not None:
+                progress(index + 1, len(targets), target)
+        return results
+
+    workers = TRAINING_WORKERS or min(len(targets), os.cpu_count() or 1)
+    if workers <= 1 or len(targets) <= 1:
+        for index, target in enumerate(targets):
+            logger.info(f"Training model for {target}...")
+            try:
+                results[target] = _train_and_save_target(df, features, target)
+            except Exception as e:
+                results[target] = e
+            if progress is not None:
+                progress(index + 1, len(targets), target)
+        return results
+
+    logger.info(f"Training {len(targets)} models with {workers} worker processes...")
+    completed = 0
+    pending = list(targets)
+    # A worker that dies breaks the whole pool; rebuild it once and retrain the targets it lost
+    for attempt in range(2):
+        pool = _get_training_pool(workers)
+        broken = []
+        try:
+            # Ship each worker only the columns it needs
+            futures = {
+                pool.submit(_train_and_save_target, df[features + [target]], features, target): target
+                for target in pending
+            }
+        except BrokenProcessPool as e:
+            futures, broken, pool_error = {}, list(pending), e
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                results[target] = future.result()
+            except BrokenProcessPool as e:
+                broken.append(target)
+                pool_error = e
+                continue
+            except Exception as e:
+                results[target] = e
+            completed += 1
+            if progress is not None:
+                progress(completed, len(targets), target)
+        if not broken:
+            return results
+        logger.error(f"Training pool broke ({pool_error}); rebuilding it for {len(broken)} targets")
+        _discard_training_pool(pool)
+        pending = broken
+
+    for target in pending:
+        results[target] = pool_error
+        completed += 1
+        if progress is not None:
+            progress(completed, len(targets), target)
+    return results
+
+# In-memory model registry: model path -> (artifact stamp, loaded model)
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+_model_load_locks = {}
+
+def _artifact_stamp(model_path):
+    """
+    Return a version stamp for a model artifact on disk.
+    Raises FileNotFoundError if the artifact does not exist.
+    """
+    stat = os.stat(model_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def save_model(model, model_path):
+    """
+    Save a model atomically so readers never see a half-written artifact.
+    The model is dumped to a temporary file in the same directory and then renamed over the old one.
+    """
+    atomic_write(model_path, lambda tmp_path: joblib.dump(model, tmp_path))
+
+class LinearModel:
+    """
+    Minimal linear model read from the model bundle; predicts without scikit-learn.
+    """
+    def __init__(self, intercept, coef, features):
+        self.intercept_ = float(intercept)
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.feature_names_in_ = np.array(features, dtype=object)
+        self.n_features_in_ = len(features)
+
+    def predict(self, X):
+        if hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)]
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+def save_model_bundle(models, features, growth_statistics=None):
+    """
+    Write every target's intercept and coefficients to one compact binary bundle.
+    Layout: magic, uint32 header length, JSON header, padding to 8 bytes, then a little-endian
+    float64 matrix with one row per target holding [intercept, coef_1, ..., coef_k].
+    """
+    targets = list(models)
+    matrix = np.empty((len(targets), len(features) + 1), dtype='<f8')
+    coefficients, intercepts = _stack_models([models[target] for target in targets], features)
+    matrix[:, 0] = intercepts
+    matrix[:, 1:] = coefficients.T
+
+    header = {
+        'format_version': 1,
+        'model_version': str(time.time_ns()),
+        'targets': targets,
+        'features': list(features),
+        'shape': list(matrix.shape),
+        'growth_statistics': growth_statistics,
+    }
+    header_bytes = json.dumps(header, default=float).encode('utf-8')
+    prefix_length = len(MODEL_BUNDLE_MAGIC) + 4 + len(header_bytes)
+    padding = b' ' * (-prefix_length % 8)
+
+    def write_bundle(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            f.write(MODEL_BUNDLE_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes) + len(padding)))
+            f.write(header_bytes + padding)
+            f.write(matrix.tobytes())
+
+    atomic_write(MODEL_BUNDLE_PATH, write_bundle)
+    logger.info(f"Saved model bundle for {len(targets)} targets to {MODEL_BUNDLE_PATH}")
+    return header['model_version']
+
+def _read_model_bundle(bundle_path):
+    """
+    Read a bundle header and map its coefficient matrix without copying it into memory.
+    """
+    with open(bundle_path, 'rb') as f:
+        if f.read(len(MODEL_BUNDLE_MAGIC)) != MODEL_BUNDLE_MAGIC:
+            raise ValueError(f"{bundle_path} is not a model bundle")
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    offset = len(MODEL_BUNDLE_MAGIC) + 4 + header_length
+    matrix = np.memmap(bundle_path, dtype='<f8', mode='r', offset=offset, shape=tuple(header['shape']))
+    header['models'] = {
+        target: LinearModel(matrix[i, 0], matrix[i, 1:], header['features'])
+        for i, target in enumerate(header['targets'])
+    }
+    return header
+
+def load_model(model_path, loader=joblib.load):
+    """
+    Return the model stored at model_path, loading it at most once per artifact version.
+    While another thread reloads a changed artifact, callers keep getting the previous model.
+    Raises FileNotFoundError if the artifact does not exist.
+    """
+    stamp = _artifact_stamp(model_path)
+    cached = _model_cache.get(model_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with _model_cache_lock:
+        load_lock = _model_load_locks.setdefault(model_path, threading.Lock())
+
+    if cached is not None:
+        # Serve the previous version instead of waiting for a reload already in progress
+        if not load_lock.acquire(blocking=False):
+            return cached[1]
+    else:
+        load_lock.acquire()
+    try:
+        cached = _model_cache.get(model_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        model = loader(model_path)
+        _model_cache[model_path] = (stamp, model)
+        logger.info(f"Loaded model from {model_path} (version {stamp[0]})")
+        return model
+    finally:
+        load_lock.release()
+
+def get_model(target):
+    """
+    Return the cached model for a target such as 'Solar' or 'Solar (GWh)'.
+    Raises FileNotFoundError if no artifact exists for the target.
+    """
+    target_column = target if target.endswith(" (GWh)") else target + " (GWh)"
+    model_path = f'{target_column.replace(" ", "_").lower()}_model.pkl'
+
+    # Prefer the bundle unless the pickled artifact was written after it
+    try:
+        bundle_stamp = _artifact_stamp(MODEL_BUNDLE_PATH)
+        try:
+            pickle_is_newer = _artifact_stamp(model_path)[0] > bundle_stamp[0]
+        except FileNotFoundError:
+            pickle_is_newer = False
+        if not pickle_is_newer:
+            bundle = load_model(MODEL_BUNDLE_PATH, loader=_read_model_bundle)
+            for name, model in bundle['models'].items():
+                if name.lower() == target_column.lower():
+                    return model
+    except FileNotFoundError:
+        pass
+
+    try:
+        return load_model(model_path)
+    except FileNotFoundError:
+        # Try the alternative path format
+        alternative_model_path = f'{target.replace(" ", "_").lower()}_model.pkl'
+        logger.info(f"Model not found at {model_path}, trying alternative path {alternative_model_path}")
+        return load_model(alternative_model_path)
+
+def _frame_records(df):
+    """
+    Convert a DataFrame to a list of dictionaries.
+    Each column is converted with tolist() in one pass, which is much cheaper than to_dict('records')
+    boxing every cell, and yields plain Python values the JSON encoder writes directly.
+    """
+    columns = [str(column) for column in df.columns]
+    values = [df.iloc[:, i].tolist() for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
 def get_predictions(target, start_year, end_year):
     """
     Load the trained model and return predictions for the given target.
     Returns a list of dictionaries containing both actual data and predictions.
     """
     try:
-        # Ensure target has the right format for model file lookup
+        # Ensure target has the right format for column lookup
         target_column = target + " (GWh)"  # This is for column name lookup
-        model_path = f'{target_column.replace(" ", "_").lower()}_model.pkl'  # Fixed model path format
-        
-        logger.debug(f"Loading model from {model_path}")
-        
-        # Try alternative path format if the first one doesn't work
-        alternative_model_path = f'{target.replace(" ", "_").lower()}_model.pkl'
         
         # Load data from MongoDB
         df = load_and_preprocess_data()
         
-        features = ['Year', 'Population (in millions)', 'Non-Renewable Energy (GWh)']
+        features = FEATURES
         logger.debug(f"Using features: {features}")
         
         # Case-insensitive column lookup - find the actual column name that matches
@@ -168,7 +639,7 @@ def get_predictions(target, start_year, end_year):
             existing_data['Predicted Production'] = 0
         
         # Convert existing data to list of dicts and remove MongoDB _id
-        existing_records = existing_data.drop('_id', axis=1, errors='ignore').to_dict('records')
+        existing_records = _frame_records(existing_data.drop('_id', axis=1, errors='ignore'))
         
         # Check if we need to make predictions for future years
         predict_start_year = max(start_year, latest_year + 1) if not existing_data.empty else start_year
@@ -179,15 +650,8 @@ def get_predictions(target, start_year, end_year):
         
         # Try to load the model
         try:
-            # First try the new path format
-            try:
-                model = joblib.load(model_path)
-                logger.info(f"Successfully loaded model from {model_path}")
-            except FileNotFoundError:
-                # Try the alternative path format
-                logger.info(f"Model not found at {model_path}, trying alternative path {alternative_model_path}")
-                model = joblib.load(alternative_model_path)
-                logger.info(f"Successfully loaded model from {alternative_model_path}")
+            # Served from the in-memory registry; reloaded only when the artifact changes
+            model = get_model(target)
             
             # Get predictions only for future years
             future_predictions = forecast_production(model, df, features, predict_start_year, end_year)
@@ -213,62 +677,230 @@ def get_predictions(target, start_year, end_year):
         # Return empty list on error to avoid crashes
         return []
 
+def _concat_column(existing, future, n_existing, n_future):
+    """
+    Join the existing and projected values of one column into a single array.
+    Missing numeric values become NaN and anything else None, both written as null.
+    """
+    reference = existing if existing is not None else future
+    numeric = reference.dtype.kind in 'iuf'
+    parts = []
+    for values, length in ((existing, n_existing), (future, n_future)):
+        if values is None:
+            values = np.full(length, np.nan) if numeric else np.full(length, None, dtype=object)
+        parts.append(values)
+    if all(part.dtype.kind in 'iuf' for part in parts) or all(part.dtype.kind == 'b' for part in parts):
+        return np.concatenate(parts)
+    return np.concatenate([part.astype(object) for part in parts])
+
+def get_predictions_columnar(target, start_year, end_year):
+    """
+    Return the same data as get_predictions as one array per field, built straight from
+    the DataFrame columns and the prediction vector without creating a dictionary per row.
+    """
+    target_column = target + " (GWh)"
+    df = load_and_preprocess_data()
+    features = FEATURES
+
+    # Case-insensitive lookup of the target column
+    actual_target_column = next((col for col in df.columns if col.lower() == target_column.lower()), None)
+
+    if 'Year' in df.columns and not df.empty:
+        latest_year = df['Year'].max()
+        existing_data = df[(df['Year'] >= start_year) & (df['Year'] <= end_year)].drop('_id', axis=1, errors='ignore')
+    else:
+        logger.warning("No Year column found or dataframe is empty")
+        latest_year = start_year
+        existing_data = pd.DataFrame()
+
+    existing = {str(column): existing_data[column].to_numpy() for column in existing_data.columns}
+    n_existing = len(existing_data)
+    existing['isPredicted'] = np.zeros(n_existing, dtype=bool)
+    if actual_target_column and actual_target_column in existing_data.columns:
+        existing['Predicted Production'] = existing_data[actual_target_column].to_numpy(dtype=float)
+    else:
+        logger.warning(f"Target column {target_column} not found in data. Using default value.")
+        existing['Predicted Production'] = np.zeros(n_existing)
+
+    future = {}
+    predict_start_year = max(start_year, latest_year + 1) if n_existing else start_year
+    if predict_start_year <= end_year:
+        try:
+            model = get_model(target)
+            future_years = project_features(df, features, predict_start_year, end_year)
+            future = {str(column): future_years[column].to_numpy() for column in future_years.columns}
+            future['Predicted Production'] = np.asarray(model.predict(future_years[features]), dtype=float)
+            future['isPredicted'] = np.ones(len(future_years), dtype=bool)
+        except FileNotFoundError:
+            logger.warning("Model files not found. Returning only existing data.")
+        except Exception as e:
+            logger.error(f"Error loading or using model: {e}")
+            future = {}
+
+    # Existing rows are sorted by Year and every projected year comes after them
+    n_future = len(future['Year']) if future else 0
+    columns = list(existing) + [column for column in future if column not in existing]
+    return {
+        column: _concat_column(existing.get(column), future.get(column), n_existing, n_future)
+        for column in columns
+    }
+
+def _stack_models(models, features):
+    """
+    Stack fitted linear models into one coefficient matrix (features x targets) and an intercept vector.
+    """
+    coefficients = []
+    for model in models:
+        coef = np.asarray(model.coef_, dtype=float).ravel()
+        # Reorder coefficients if the model was fitted with a different column order
+        fitted_features = list(getattr(model, 'feature_names_in_', features))
+        if fitted_features != list(features):
+            coef = coef[[fitted_features.index(feature) for feature in features]]
+        coefficients.append(coef)
+    intercepts = np.array([float(np.ravel(model.intercept_)[0]) for model in models])
+    return np.column_stack(coefficients), intercepts
+
+def get_all_predictions(start_year, end_year, targets=None):
+    """
+    Return predictions for several targets from one data load and one feature projection.
+    Targets are short names such as 'Solar'; all renewable targets are used when None.
+    Returns a dictionary mapping each target to the records get_predictions would return.
+    """
+    if targets is None:
+        targets = [target.replace(" (GWh)", "") for target in TARGETS]
+
+    df = load_and_preprocess_data()
+    features = FEATURES
+
+    # Get existing data for the requested range once for every target
+    if 'Year' in df.columns and not df.empty:
+        latest_year = df['Year'].max()
+        existing_data = df[(df['Year'] >= start_year) & (df['Year'] <= end_year)].drop('_id', axis=1, errors='ignore')
+    else:
+        logger.warning("No Year column found or dataframe is empty")
+        latest_year = start_year
+        existing_data = pd.DataFrame()
+    existing_base = existing_data.assign(isPredicted=False)
+
+    results = {}
+    for target in targets:
+        target_column = target + " (GWh)"
+        if target_column in existing_base.columns:
+            existing_target = existing_base.assign(**{'Predicted Production': existing_base[target_column]})
+        else:
+            logger.warning(f"Target column {target_column} not found in data. Using default value.")
+            existing_target = existing_base.assign(**{'Predicted Production': 0})
+        results[target] = _frame_records(existing_target)
+
+    predict_start_year = max(start_year, latest_year + 1) if not existing_data.empty else start_year
+    if predict_start_year <= end_year:
+        # Collect the models that exist; targets without one return only existing data
+        available_targets = []
+        models = []
+        for target in targets:
+            try:
+                models.append(get_model(target))
+                available_targets.append(target)
+            except FileNotFoundError:
+                logger.warning(f"Model file not found for {target}. Returning only existing data.")
+
+        if models:
+            # Project the features once and apply every model in a single matrix multiply
+            future_years = project_features(df, features, predict_start_year, end_year)
+            coefficients, intercepts = _stack_models(models, features)
+            predictions = future_years[features].to_numpy(dtype=float) @ coefficients + intercepts
+
+            future_years['isPredicted'] = True
+            future_records = _frame_records(future_years)
+            for j, target in enumerate(available_targets):
+                results[target] += [
+                    {**record, 'Predicted Production': value}
+                    for record, value in zip(future_records, predictions[:, j].tolist())
+                ]
+
+    # Sort by year
+    for target in targets:
+        results[target] = sorted(results[target], key=lambda x: x.get('Year', 0))
+
+    return results
+
+# Features projected forward by their average historical growth rate
+PROJECTED_FEATURES = ['Population (in millions)', 'Non-Renewable Energy (GWh)', 'Gross Domestic Product']
+
+def get_growth_statistics(df):
+    """
+    Return the latest year plus (last value, average growth rate) for each projected feature.
+    Statistics for the cached dataset are computed once per dataset version.
+    """
+    _, cached_df, derived = _dataset_cache
+    if df is cached_df and 'growth_statistics' in derived:
+        return derived['growth_statistics']
+
+    stats = {'latest_year': df['Year'].iloc[-1], 'features': {}}
+    for feature in PROJECTED_FEATURES:
+        if feature in df.columns and not df[feature].empty:
+            stats['features'][feature] = (df[feature].iloc[-1], df[feature].pct_change().mean())
+
+    if df is cached_df:
+        derived['growth_statistics'] = stats
+    return stats
+
+def project_features(df, features, start_year, end_year):
+    """
+    Project the model features for every year in the range in a single NumPy broadcast.
+    Returns a DataFrame with a Year column and one column per feature.
+    """
+    stats = get_growth_statistics(df)
+    years = np.arange(start_year, end_year + 1)
+    steps = years - stats['latest_year']
+
+    # Population and non-renewable energy are always projected, GDP only when the model uses it
+    projected = ['Population (in millions)', 'Non-Renewable Energy (GWh)']
+    if 'Gross Domestic Product' in features:
+        projected.append('Gross Domestic Product')
+
+    last_values = []
+    growth_rates = []
+    for feature in projected:
+        if feature in stats['features']:
+            last_value, growth_rate = stats['features'][feature]
+        elif feature == 'Gross Domestic Product':
+            logger.warning("GDP data not available, using default growth rate")
+            last_value, growth_rate = 1000, 0.03
+        else:
+            raise KeyError(feature)
+        last_values.append(last_value)
+        growth_rates.append(growth_rate)
+
+    # One row per projected feature, one column per year
+    values = np.asarray(last_values, dtype=float)[:, None] * (1 + np.asarray(growth_rates, dtype=float))[:, None] ** steps[None, :]
+
+    future_years = pd.DataFrame({'Year': years})
+    for i, feature in enumerate(projected):
+        future_years[feature] = values[i]
+
+    # Ensure all required features exist
+    for feature in features:
+        if feature not in future_years.columns:
+            future_years[feature] = 1.0  # Default value
+            logger.warning(f"Using default value for missing feature: {feature}")
+
+    return future_years
+
 def forecast_production(model, df, features, start_year, end_year):
     """
     Forecast future production using the trained model.
     Returns a list of dictionaries with predictions for future years.
     """
     try:
-        future_years = pd.DataFrame({'Year': range(start_year, end_year + 1)})
-        
-        # Calculate growth rates for features we need to project
-        avg_population_growth = df['Population (in millions)'].pct_change().mean()
-        avg_non_renewable_growth = df['Non-Renewable Energy (GWh)'].pct_change().mean()
-        
-        # Get the most recent values
-        last_population = df['Population (in millions)'].iloc[-1]
-        last_non_renewable = df['Non-Renewable Energy (GWh)'].iloc[-1]
-        latest_year = df['Year'].iloc[-1]
-        
-        # Calculate projected values
-        future_years['Population (in millions)'] = [
-            last_population * (1 + avg_population_growth) ** (year - latest_year)
-            for year in future_years['Year']
-        ]
-        
-        future_years['Non-Renewable Energy (GWh)'] = [
-            last_non_renewable * (1 + avg_non_renewable_growth) ** (year - latest_year)
-            for year in future_years['Year']
-        ]
-        
-        # Project GDP if needed
-        if 'Gross Domestic Product' in features:
-            if 'Gross Domestic Product' in df.columns and not df['Gross Domestic Product'].empty:
-                avg_gdp_growth = df['Gross Domestic Product'].pct_change().mean()
-                last_gdp = df['Gross Domestic Product'].iloc[-1]
-                future_years['Gross Domestic Product'] = [
-                    last_gdp * (1 + avg_gdp_growth) ** (year - latest_year)
-                    for year in future_years['Year']
-                ]
-            else:
-                logger.warning("GDP data not available, using default growth rate")
-                future_years['Gross Domestic Product'] = [
-                    1000 * (1.03) ** (year - latest_year)
-                    for year in future_years['Year']
-                ]
-        
-        # Ensure all required features exist
-        for feature in features:
-            if feature not in future_years.columns:
-                future_years[feature] = 1.0  # Default value
-                logger.warning(f"Using default value for missing feature: {feature}")
+        future_years = project_features(df, features, start_year, end_year)
         
         # Make predictions
         future_years['Predicted Production'] = model.predict(future_years[features])
         future_years['isPredicted'] = True
         
         # Convert to list of dictionaries
-        predictions = future_years.to_dict('records')
+        predictions = _frame_records(future_years)
         
         logger.debug(f"Generated {len(predictions)} predictions")
         return predictions
@@ -277,10 +909,315 @@ def forecast_production(model, df, features, start_year, end_year):
         logger.error(f"Error in forecast_production: {e}")
         raise    
     
-def train_and_save_models():
+# Incremental OLS: per-target sufficient statistics stored next to each model. The thread lock
+# orders updates within a process and the file lock orders them between processes.
+_incremental_lock = threading.Lock()
+
+def _statistics_path(target):
+    return f'{target.replace(" ", "_").lower()}_model.ols.npz'
+
+def _design_row(record, features, origin):
+    """
+    Return the design row [1, x1 - o1, ..., xk - ok] for a record, or None if a feature is missing.
+    """
+    row = np.array([1.0] + [to_float(record.get(feature)) for feature in features])
+    row[1:] -= origin
+    return None if np.isnan(row).any() else row
+
+def compute_sufficient_statistics(df, features, target, origin=None):
+    """
+    Return XᵀX, Xᵀy, the row count and the feature origin for an intercept-augmented design matrix.
+    Features are stored relative to an origin, by default their means, so the accumulators stay
+    well conditioned: raw Year values near 2000 make XᵀX close to singular. Later updates
+    must use the same origin.
+    """
+    X = df[features].to_numpy(dtype=float)
+    if origin is None:
+        origin = X.mean(axis=0) if len(X) else np.zeros(len(features))
+    X = np.column_stack([np.ones(len(df)), X - origin])
+    y = df[target].to_numpy(dtype=float)
+    return X.T @ X, X.T @ y, len(df), origin
+
+def _solve_ols(xtx, xty, origin):
+    """
+    Solve the normal equations of centred features; returns (intercept, coefficients) for the raw features.
+    Columns are also rescaled to unit diagonal because Year and GWh values differ by orders of magnitude.
+    """
+    scale = 1.0 / np.sqrt(np.where(np.diag(xtx) > 0, np.diag(xtx), 1.0))
+    beta = np.linalg.lstsq(xtx * np.outer(scale, scale), xty * scale, rcond=None)[0] * scale
+    return beta[0] - beta[1:] @ origin, beta[1:]
+
+def update_statistics(xtx, xty, n_rows, origin, features, target, added=(), removed=()):
+    """
+    Return the accumulators after removing and adding records with rank-one updates,
+    or None if a record lacks a feature or the target value.
+    """
+    xtx = xtx.copy()
+    xty = xty.copy()
+    for sign, records in ((-1.0, removed), (1.0, added)):
+        for record in records:
+            x = _design_row(record, features, origin)
+            y = to_float(record.get(target))
+            if x is None or np.isnan(y):
+                return None
+            xtx += sign * np.outer(x, x)
+            xty += sign * x * y
+            n_rows += int(sign)
+    return xtx, xty, n_rows
+
+def _model_from_coefficients(intercept, coef, features):
+    """
+    Build a model that predicts with the given intercept and coefficients.
+    """
+    return LinearModel(intercept, coef, features)
+
+def _save_incremental_model(target, features, xtx, xty, n_rows, origin):
+    """
+    Solve for the coefficients and atomically save both the model and its accumulators.
+    """
+    intercept, coef = _solve_ols(xtx, xty, origin)
+    model = _model_from_coefficients(intercept, coef, features)
+
+    def write_statistics(tmp_path):
+        # Write through a file object; np.savez would append .npz to a path
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, xtx=xtx, xty=xty, n_rows=n_rows, origin=origin, features=np.array(features))
+
+    atomic_write(_statistics_path(target), write_statistics)
+    save_model(model, f'{target.replace(" ", "_").lower()}_model.pkl')
+    return model
+
+def _relative_drift(previous, refitted):
+    """
+    Return the largest coefficient difference relative to the coefficient's magnitude.
+    Intercepts are around 1e6 while slopes can be small, so absolute differences are not comparable.
+    """
+    magnitude = np.maximum(np.abs(previous), np.abs(refitted))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(magnitude > 0, np.abs(previous - refitted) / magnitude, 0.0)
+    return float(np.max(relative))
+
+def build_incremental_models(df, features, targets, progress=None):
+    """
+    Refit every target from the full history and store its accumulators.
+    Also serves as the consistency check for incremental updates: the coefficients of the
+    previously served models are compared with the refit and any drift is reported.
+    Returns a dictionary mapping each target to its fitted model or the exception it raised.
+    """
+    if 'isDeleted' in df.columns:
+        df = df[df['isDeleted'] != True]
+    results = {}
+    with _incremental_lock, file_lock(INCREMENTAL_LOCK_PATH):
+        for index, target in enumerate(targets):
+            try:
+                previous = None
+                try:
+                    previous = get_model(target)
+                except FileNotFoundError:
+                    pass
+                model = _save_incremental_model(target, features, *compute_sufficient_statistics(df, features, target))
+                if previous is not None and np.shape(previous.coef_) == np.shape(model.coef_):
+                    drift = _relative_drift(
+                        np.append(previous.coef_, previous.intercept_), np.append(model.coef_, model.intercept_)
+                    )
+                    if drift > INCREMENTAL_TOLERANCE:
+                        logger.warning(f"Model for {target} drifted by {drift:.3g} (relative) from the full refit")
+                results[target] = model
+            except Exception as e:
+                results[target] = e
+            if progress is not None:
+                progress(index + 1, len(targets), target)
+    return results
+
+def apply_incremental_update(added=(), removed=()):
+    """
+    Adjust every target model for records that were added to or removed from the dataset
+    with rank-one updates of the stored accumulators, without reading the collection.
+    Returns False if an update is not possible (missing accumulators or incomplete records),
+    in which case the caller should fall back to a full retrain.
+    """
+    features = FEATURES
+    # Soft-deleted records are not part of the training data
+    added = [record for record in added if not record.get('isDeleted')]
+    removed = [record for record in removed if not record.get('isDeleted')]
+    if not added and not removed:
+        return True
+
+    with _incremental_lock, file_lock(INCREMENTAL_LOCK_PATH):
+        updates = {}
+        for target in TARGETS:
+            try:
+                with np.load(_statistics_path(target)) as stored:
+                    # Accumulators written before features were centred have no origin
+                    if list(stored['features']) != list(features) or 'origin' not in stored:
+                        return False
+                    statistics = (stored['xtx'], stored['xty'], int(stored['n_rows']), stored['origin'])
+            except FileNotFoundError:
+                return False
+
+            updated = update_statistics(*statistics, features, target, added, removed)
+            if updated is None:
+                # The full pipeline would forward fill this record; only a refit can match it
+                return False
+            updates[target] = updated + (statistics[3],)
+
+        models = {}
+        for target, statistics in updates.items():
+            models[target] = _save_incremental_model(target, features, *statistics)
+        _save_bundle_for(models)
+    logger.info(f"Applied incremental update: {len(added)} added, {len(removed)} removed")
+    return True
+
+def update_models_for_change(added=(), removed=(), reason=None):
+    """
+    Bring the models up to date after records were added to or removed from the dataset.
+    In incremental mode the stored accumulators are adjusted in place; otherwise, or when that
+    is not possible, a retrain is queued.
+    Returns a dictionary describing what was done.
+    """
+    if MODEL_MODE == 'incremental':
+        try:
+            if apply_incremental_update(added, removed):
+                _refresh_forecasts()
+                return {'model_update': 'incremental', 'model_version': get_model_version()}
+        except Exception as e:
+            logger.error(f"Incremental model update failed, queueing a retrain: {e}")
+    # Imported here because training_jobs imports this module when it trains
+    from training_jobs import enqueue_retrain
+    return {'model_update': 'retrain_queued', 'training_job': enqueue_retrain(reason)}
+
+def _save_bundle_for(models, df=None):
+    """
+    Write the model bundle from freshly trained models, filling in targets that failed
+    with the model currently being served. Failures are logged, not raised.
+    """
+    try:
+        bundle_models = {}
+        for target in TARGETS:
+            model = models.get(target)
+            if model is None or isinstance(model, Exception):
+                model = get_model(target)
+            bundle_models[target] = model
+        growth_statistics = get_growth_statistics(df) if df is not None else None
+        return save_model_bundle(bundle_models, FEATURES, growth_statistics)
+    except Exception as e:
+        logger.error(f"Error saving model bundle: {e}")
+        return None
+
+# Cached forecastsMeta document: (document, monotonic time it was read)
+_forecast_meta_cache = (None, 0.0)
+
+def materialize_forecasts(end_year=None):
+    """
+    Write the forecast table: one row per target and year, from the first year of data out to
+    the configured horizon. Rows of a build share a generation id that is published in
+    forecastsMeta only after every row is written, so readers never see a partial build.
+    """
+    global _forecast_meta_cache
+    if end_year is None:
+        end_year = FORECAST_HORIZON_END_YEAR
+
+    df = load_and_preprocess_data()
+    dataset_version = _dataset_cache[0]
+    if df.empty or 'Year' not in df.columns:
+        logger.warning("No data available to materialize forecasts")
+        return None
+    start_year = int(df['Year'].min())
+
+    predictions = get_all_predictions(start_year, end_year)
+    generation = uuid.uuid4().hex
+    rows = []
+    for target, records in predictions.items():
+        for record in records:
+            rows.append({**record, 'target': target.lower(), 'generation': generation})
+
+    collection = get_collection(FORECASTS_COLLECTION)
+    collection.create_index([('generation', 1), ('target', 1), ('Year', 1)])
+    if rows:
+        collection.insert_many(rows, ordered=False)
+
+    meta_collection = get_collection(FORECASTS_META_COLLECTION)
+    previous = meta_collection.find_one({'_id': 'current'})
+    meta = {
+        '_id': 'current',
+        'generation': generation,
+        'previous_generation': previous['generation'] if previous else None,
+        'dataset_version': dataset_version,
+        'model_version': get_model_version(),
+        'start_year': start_year,
+        'end_year': end_year,
+        'rows': len(rows),
+        'built_at': time.time()
+    }
+    meta_collection.replace_one({'_id': 'current'}, meta, upsert=True)
+    _forecast_meta_cache = (meta, time.monotonic())
+
+    # Keep the previous build for readers that have not yet seen the new generation
+    collection.delete_many({'generation': {'$nin': [generation, meta['previous_generation']]}})
+    logger.info(f"Materialized {len(rows)} forecast rows for {start_year}-{end_year} (generation {generation})")
+    return meta
+
+def _get_forecast_meta():
+    """
+    Return the forecastsMeta document, re-read at most once per DATASET_VERSION_CHECK_INTERVAL.
+    """
+    global _forecast_meta_cache
+    meta, read_at = _forecast_meta_cache
+    now = time.monotonic()
+    if read_at and now - read_at < DATASET_VERSION_CHECK_INTERVAL:
+        return meta
+    meta = get_collection(FORECASTS_META_COLLECTION).find_one({'_id': 'current'})
+    _forecast_meta_cache = (meta, now)
+    return meta
+
+def get_materialized_predictions(target, start_year, end_year):
+    """
+    Return the predictions for a target from the forecast table with one indexed range query.
+    Returns None if the table does not cover the request or was built from an older dataset,
+    in which case the caller should compute the predictions with get_predictions.
+    """
+    meta = _get_forecast_meta()
+    if meta is None:
+        return None
+    if meta['dataset_version'] != get_dataset_version(COLLECTION_NAME):
+        return None
+    if start_year < meta['start_year'] or end_year > meta['end_year']:
+        return None
+
+    rows = list(get_collection(FORECASTS_COLLECTION).find(
+        {'generation': meta['generation'], 'target': target.lower(), 'Year': {'$gte': start_year, '$lte': end_year}},
+        {'_id': 0, 'generation': 0, 'target': 0}
+    ).sort('Year', 1))
+    # An empty result means the generation was replaced or the target is unknown
+    return rows or None
+
+def _refresh_forecasts():
+    """
+    Rebuild the forecast table after the models changed. Failures are logged, not raised.
+    """
+    try:
+        materialize_forecasts()
+    except Exception as e:
+        logger.error(f"Error materializing forecasts: {e}")
+
+def get_model_version():
+    """
+    Return the version of the trained model set: the newest artifact stamp across all targets.
+    Returns None if no model has been trained yet.
+    """
+    stamps = []
+    for model_path in [f'{target.replace(" ", "_").lower()}_model.pkl' for target in TARGETS] + [MODEL_BUNDLE_PATH]:
+        try:
+            stamps.append(_artifact_stamp(model_path)[0])
+        except FileNotFoundError:
+            pass
+    return str(max(stamps)) if stamps else None
+
+def train_and_save_models(progress=None):
     """
     Train and save all prediction models.
     Called by the API to manually trigger model training.
+    If given, progress(completed, total, target) is called after each target is trained.
     """
     logger.info("Starting model training process...")
     
@@ -292,8 +1229,8 @@ def train_and_save_models():
             logger.error("No data available for training models")
             return {"status": "error", "message": "No data available for training models"}
         
-        features = ['Year', 'Population (in millions)', 'Non-Renewable Energy (GWh)']
-        targets = ['Geothermal (GWh)', 'Hydro (GWh)', 'Biomass (GWh)', 'Solar (GWh)', 'Wind (GWh)']
+        features = FEATURES
+        targets = TARGETS
         
         # Check if we have the required columns
         missing_columns = [col for col in features + targets if col not in df.columns]
@@ -307,23 +1244,27 @@ def train_and_save_models():
         
         # Train models
         trained_models = {}
-        for target in targets:
-            try:
-                logger.info(f"Training model for {target}...")
-                model = train_model(df, features, target)
-                model_path = f'{target.replace(" ", "_").lower()}_model.pkl'
-                joblib.dump(model, model_path)
-                logger.info(f"Saved model to {model_path}")
+        if MODEL_MODE == 'incremental':
+            # Full refit from the sufficient statistics, which also checks incremental updates for drift
+            results = build_incremental_models(df, features, targets, progress=progress)
+        else:
+            results = train_all_models(df, features, targets, progress=progress)
+        for target, model in results.items():
+            if isinstance(model, Exception):
+                logger.error(f"Error training model for {target}: {model}")
+                trained_models[target] = f"error: {str(model)}"
+            else:
                 trained_models[target] = "success"
-            except Exception as e:
-                logger.error(f"Error training model for {target}: {e}")
-                trained_models[target] = f"error: {str(e)}"
+        
+        _save_bundle_for(results, df)
+        _refresh_forecasts()
         
         return {
             "status": "success",
             "message": "Models trained and saved successfully",
             "models": trained_models,
-            "data_rows": len(df)
+            "data_rows": len(df),
+            "model_version": get_model_version()
         }
         
     except Exception as e:
@@ -333,13 +1274,10 @@ def train_and_save_models():
 def main():
     # Load data from MongoDB
     df = load_and_preprocess_data()
-    features = ['Year', 'Population (in millions)', 'Non-Renewable Energy (GWh)']
-    targets = ['Geothermal (GWh)', 'Hydro (GWh)', 'Biomass (GWh)', 'Solar (GWh)', 'Wind (GWh)']
-    models = {}
-    for target in targets:
-        model = train_model(df, features, target)
-        models[target] = model
-        joblib.dump(model, f'{target.replace(" ", "_").lower()}_model.pkl')
+    features = FEATURES
+    targets = TARGETS
+    models = train_all_models(df, features, targets)
+    _save_bundle_for(models, df)
     for target in targets:
         model = models[target]
         future_predictions = forecast_production(model, df, features, 2024, 2040)
@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+import logging
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import ConnectionFailure
+from pymongo import monitoring
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# MongoDB connection settings shared by every analytics module
+MONGO_URI = os.getenv("MONGO_URI") or os.getenv("MONGODB_URI")
+DATABASE_NAME = "ecopulse"
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Seconds between pings; 0 pings on every call, a negative value never pings
+MONGO_HEALTH_CHECK_INTERVAL = float(os.getenv("MONGO_HEALTH_CHECK_INTERVAL", "30"))
+# Collection holding one version counter per dataset, bumped by every write path
+DATASET_VERSIONS_COLLECTION = "datasetVersions"
+# Seconds a worker trusts its last read of a dataset version before checking again
+DATASET_VERSION_CHECK_INTERVAL = float(os.getenv("DATASET_VERSION_CHECK_INTERVAL", "5"))
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Count connection pool events so reuse can be checked in production.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {
+                'connections_created': 0,
+                'connections_closed': 0,
+                'checkouts': 0,
+                'checkout_failures': 0,
+                'checkins': 0,
+                'pool_clears': 0,
+            }
+
+    def _incr(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr('pool_clears')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr('connections_created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr('connections_closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr('checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._incr('checkouts')
+
+    def connection_checked_in(self, event):
+        self._incr('checkins')
+
+# Process-wide client registry; rebuilt lazily in each forked worker
+_client = None
+_client_pid = None
+_client_created_at = None
+_last_ping = 0.0
+_client_lock = threading.Lock()
+_pool_listener = PoolStatsListener()
+_stats = {'get_client_calls': 0, 'clients_created': 0, 'health_checks': 0, 'health_check_failures': 0}
+# Dataset name -> (version, monotonic time it was read)
+_dataset_versions = {}
+
+def _reset_after_fork():
+    """
+    Drop the client inherited from the parent process.
+    MongoClient is not fork-safe, so each child builds its own on first use.
+    """
+    global _client, _client_pid, _client_created_at, _last_ping, _client_lock
+    _client = None
+    _client_pid = None
+    _client_created_at = None
+    _last_ping = 0.0
+    _client_lock = threading.Lock()
+    _pool_listener.reset()
+    _dataset_versions.clear()
+    for key in _stats:
+        _stats[key] = 0
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_client():
+    """
+    Return the shared MongoClient, creating it on first use in this process.
+    """
+    global _client, _client_pid, _client_created_at, _last_ping
+    _stats['get_client_calls'] += 1
+    client = _client
+    if client is not None and _client_pid == os.getpid():
+        return client
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=[_pool_listener],
+            )
+            _client_pid = os.getpid()
+            _client_created_at = time.time()
+            _last_ping = 0.0
+            _stats['clients_created'] += 1
+            logger.info(f"Created pooled MongoDB client (pid {_client_pid}, maxPoolSize {MONGO_MAX_POOL_SIZE})")
+        return _client
+
+def check_health(force=False):
+    """
+    Ping the server if the last successful ping is older than the health check interval.
+    Raises ConnectionFailure if the server cannot be reached.
+    """
+    global _last_ping
+    if MONGO_HEALTH_CHECK_INTERVAL < 0 and not force:
+        return
+    now = time.monotonic()
+    if not force and _last_ping and now - _last_ping < MONGO_HEALTH_CHECK_INTERVAL:
+        return
+    _stats['health_checks'] += 1
+    try:
+        get_client().admin.command('ping')
+        _last_ping = now
+    except ConnectionFailure:
+        _stats['health_check_failures'] += 1
+        _last_ping = 0.0
+        raise
+
+def get_collection(collection_name, retries=3, delay=5):
+    """
+    Return a collection from the shared client.
+    Retries the health check in case of failure.
+    """
+    for attempt in range(retries):
+        try:
+            check_health()
+            return get_client()[DATABASE_NAME][collection_name]
+        except ConnectionFailure as e:
+            logger.error(f"Error connecting to MongoDB (attempt {attempt + 1}): {e}")
+            if attempt < retries - 1:
+                time.sleep(delay)
+            else:
+                raise
+
+def get_pool_stats():
+    """
+    Return client registry and connection pool counters for this process.
+    """
+    stats = dict(_stats)
+    stats.update(_pool_listener.snapshot())
+    stats['pid'] = os.getpid()
+    stats['client_initialized'] = _client is not None and _client_pid == os.getpid()
+    stats['client_age_seconds'] = round(time.time() - _client_created_at, 3) if stats['client_initialized'] else None
+    stats['max_pool_size'] = MONGO_MAX_POOL_SIZE
+    stats['min_pool_size'] = MONGO_MIN_POOL_SIZE
+    stats['health_check_interval'] = MONGO_HEALTH_CHECK_INTERVAL
+    # Connections currently checked out of the pool
+    stats['in_use'] = stats['checkouts'] - stats['checkins']
+    return stats
+
+def get_dataset_version(name, retries=3, delay=5):
+    """
+    Return the current version counter of a dataset.
+    The value is re-read from MongoDB at most once per DATASET_VERSION_CHECK_INTERVAL,
+    so changes made by other workers are picked up within that window.
+    """
+    now = time.monotonic()
+    cached = _dataset_versions.get(name)
+    if cached is not None and now - cached[1] < DATASET_VERSION_CHECK_INTERVAL:
+        return cached[0]
+    doc = get_collection(DATASET_VERSIONS_COLLECTION, retries=retries, delay=delay).find_one({'_id': name})
+    version = doc['version'] if doc else 0
+    _dataset_versions[name] = (version, now)
+    return version
+
+def bump_dataset_version(name):
+    """
+    Increment the version counter of a dataset after it has been written to.
+    Returns the new version.
+    """
+    doc = get_collection(DATASET_VERSIONS_COLLECTION).find_one_and_update(
+        {'_id': name},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _dataset_versions[name] = (doc['version'], time.monotonic())
+    logger.debug(f"Dataset {name} is now at version {doc['version']}")
+    return doc['version']
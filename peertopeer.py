@@ -1,46 +1,36 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 import os
 import logging
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import threading
+import hashlib
 import time
+from mongodb import get_collection, get_dataset_version, bump_dataset_version, DATASET_VERSION_CHECK_INTERVAL
+from datasets import load_excel_dataset_versioned, to_float
 
 # Configure the logger
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Load dataset
+# Dataset location; the workbook is read through the shared dataset cache
 script_dir = os.path.dirname(os.path.abspath(__file__))
 file_path = os.path.join(script_dir, 'peertopeer.xlsx')
-df = pd.read_excel(file_path)
 
-# MongoDB connection
-MONGO_URI = os.getenv("MONGODB_URI")  # Load MongoDB URI from environment variables
-DATABASE_NAME = "ecopulse"  # Replace with your database name
+# MongoDB connection (client and URI are shared through mongodb.py)
 COLLECTION_NAME = "peertopeer"  # Replace with your collection name
 
 def connect_to_mongodb_peertopeer(retries=3, delay=5):
     """
-    Connect to MongoDB Atlas and return the collection.
+    Return the collection from the process-wide pooled MongoDB client.
     Retries the connection in case of failure.
     """
-    for attempt in range(retries):
-        try:
-            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-            db = client[DATABASE_NAME]
-            collection = db[COLLECTION_NAME]
-            # Attempt to ping the server to check the connection
-            client.admin.command('ping')
-            logger.debug("Connected to MongoDB Atlas successfully.")
-            return collection
-        except ConnectionFailure as e:
-            logger.error(f"Error connecting to MongoDB (attempt {attempt + 1}): {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                raise
+    return get_collection(COLLECTION_NAME, retries=retries, delay=delay)
+
+def mark_dataset_changed():
+    """
+    Bump the collection's dataset version after a write so every worker re-reads it.
+    """
+    return bump_dataset_version(COLLECTION_NAME)
 
 def createPeertoPeer(data):
     """
@@ -50,17 +40,12 @@ def createPeertoPeer(data):
         collection = connect_to_mongodb_peertopeer()
         # Add the isPredicted flag for actual data
         collection.insert_one(data)
+        mark_dataset_changed()
         logger.info("Actual data inserted successfully.")
     except Exception as e:
         logger.error(f"Error inserting actual data: {e}")
         raise
 
-# Display DataFrame columns and first few rows
-# print("DataFrame Columns:")
-# print(df.columns)
-# print("\nFirst few rows of the DataFrame:")
-# print(df.head())
-
 # Define subgrid names and metrics
 subgrids = ['Bohol', 'Cebu', 'Negros', 'Panay', 'Leyte-Samar']
 metrics = [
@@ -75,101 +60,297 @@ metrics = [
     'Visayas Total Power Consumption (GWh)'  # Ensure this metric is included
 ]
 
-# Create a dictionary to hold DataFrames for each subgrid
-subgrid_data = {}
+# Energy type holding each place's share of the Visayas consumption
+CONSUMPTION_METRIC = 'Estimated Consumption (GWh)'
+GENERATION_METRIC = 'Total Power Generation (GWh)'
+VISAYAS_GENERATION_COLUMN = 'Visayas Total Power Generation (GWh)'
+VISAYAS_CONSUMPTION_COLUMN = 'Visayas Total Power Consumption (GWh)'
+# Every energy type a forecast can hold, in cube order
+ENERGY_TYPES = [GENERATION_METRIC, CONSUMPTION_METRIC] + [metric for metric in metrics if metric != GENERATION_METRIC]
+
+# Merged dataset: ((workbook stamp, collection version), DataFrame)
+_merged = (None, None)
+_merged_lock = threading.Lock()
+# Monotonic time until which MongoDB is treated as unreachable and the workbook is used alone
+_mongo_unavailable_until = 0.0
+
+def merge_records(baseline, records):
+    """
+    Overlay MongoDB records on the workbook baseline.
+    Each record is a wide row keyed by Year (or year); its numeric fields replace the baseline
+    values of that year, and years missing from the workbook are added. Later records win.
+    """
+    series_columns = set(baseline.columns) | {f'{place} {metric}' for place in subgrids for metric in metrics}
+    series_columns |= {VISAYAS_GENERATION_COLUMN, VISAYAS_CONSUMPTION_COLUMN}
+    series_columns.discard('Year')
+
+    overrides = {}
+    for record in records:
+        year = record.get('Year', record.get('year'))
+        if year is None or np.isnan(to_float(year)):
+            continue
+        year_values = overrides.setdefault(int(to_float(year)), {})
+        for key, value in record.items():
+            if key in series_columns:
+                value = to_float(value)
+                if not np.isnan(value):
+                    year_values[key] = value
+    if not overrides:
+        return baseline
+
+    merged = baseline.drop_duplicates('Year').set_index('Year')
+    touched = {key for year_values in overrides.values() for key in year_values}
+    new_columns = sorted(touched - set(merged.columns))
+    merged = merged.reindex(index=sorted(set(merged.index) | set(overrides)), columns=list(merged.columns) + new_columns)
+    merged = merged.astype({column: float for column in touched})
+    for year, year_values in overrides.items():
+        if year_values:
+            merged.loc[year, list(year_values)] = list(year_values.values())
+    merged.index.name = 'Year'
+    return merged.reset_index()
+
+def get_dataset():
+    """
+    Return the version and DataFrame the forecasts are fitted on: the workbook with the
+    peertopeer collection merged over it. The version combines the workbook stamp and the
+    collection's dataset version, so editing either invalidates the merged data.
+    If MongoDB cannot be reached the workbook alone is used, and MongoDB is not tried again
+    for DATASET_VERSION_CHECK_INTERVAL seconds so requests do not wait on connection retries.
+    """
+    global _merged, _mongo_unavailable_until
+    stamp, baseline = load_excel_dataset_versioned(file_path)
+    if time.monotonic() < _mongo_unavailable_until:
+        return (stamp, None), baseline
+    try:
+        collection_version = get_dataset_version(COLLECTION_NAME, retries=1)
+    except Exception as e:
+        logger.error(f"Error reading the {COLLECTION_NAME} dataset version, using the workbook only: {e}")
+        _mongo_unavailable_until = time.monotonic() + DATASET_VERSION_CHECK_INTERVAL
+        return (stamp, None), baseline
+
+    version = (stamp, collection_version)
+    with _merged_lock:
+        if _merged[0] == version:
+            return _merged
+        try:
+            collection = connect_to_mongodb_peertopeer(retries=1)
+            records = list(collection.find({'isDeleted': {'$ne': True}}, {'_id': 0}).sort('_id', 1))
+        except Exception as e:
+            logger.error(f"Error loading {COLLECTION_NAME} records, using the workbook only: {e}")
+            _mongo_unavailable_until = time.monotonic() + DATASET_VERSION_CHECK_INTERVAL
+            return (stamp, None), baseline
+        _merged = (version, merge_records(baseline, records))
+        logger.debug(f"Merged {len(records)} {COLLECTION_NAME} records over the workbook (version {version})")
+        return _merged
+
+def _series_fingerprint(frame, column):
+    """
+    Hash the non-missing (year, value) pairs of a series; equal fingerprints mean the same fit.
+    """
+    values = frame[column].to_numpy(dtype=float)
+    keep = ~np.isnan(values)
+    pairs = np.column_stack([frame['Year'].to_numpy(dtype=float)[keep], values[keep]])
+    return hashlib.blake2b(np.ascontiguousarray(pairs).tobytes(), digest_size=16).hexdigest()
+
+class SeriesFit:
+    """
+    Closed-form least squares line through one series. Years present in the data return their
+    actual value, years between or after the data points the regression value, and years before
+    the first data point 0. An empty series predicts 0 everywhere.
+    """
+    __slots__ = ('years', 'values', 'slope', 'intercept', 'min_year')
 
-# Extract data for each subgrid and metric
-for subgrid in subgrids:
-    # Filter columns that belong to the current subgrid and metrics
-    subgrid_columns = ['Year'] + [f'{subgrid} {metric}' for metric in metrics if f'{subgrid} {metric}' in df.columns]
+    def __init__(self, years, values):
+        years = np.asarray(years, dtype=float)
+        values = np.asarray(values, dtype=float)
+        keep = ~np.isnan(values)
+        years, values = years[keep], values[keep]
 
-    if len(subgrid_columns) > 1:  # Ensure there are relevant columns
-        # Create a DataFrame for the subgrid with 'Year' and its specific columns
-        subgrid_df = df[subgrid_columns].copy()
+        # Sorted distinct years with the first value recorded for each
+        self.years, first = np.unique(years, return_index=True)
+        self.values = values[first]
+        if len(years):
+            mean_year = years.mean()
+            mean_value = values.mean()
+            centered = years - mean_year
+            spread = centered @ centered
+            self.slope = float(centered @ (values - mean_value) / spread) if spread > 0 else 0.0
+            self.intercept = float(mean_value - self.slope * mean_year)
+            self.min_year = float(years.min())
+        else:
+            self.slope = self.intercept = 0.0
+            self.min_year = None
 
-        # Rename columns to remove the subgrid prefix for clarity
-        subgrid_df.columns = ['Year'] + [col.replace(f'{subgrid} ', '') for col in subgrid_columns[1:]]
+    def evaluate(self, years):
+        """
+        Return the value of the series for every year in one vectorized pass.
+        """
+        years = np.asarray(years, dtype=float)
+        if self.min_year is None:
+            return np.zeros(len(years))
+        result = self.intercept + self.slope * years
+        result[years < self.min_year] = 0.0
+        # Replace regression values by actual values where the year is in the data
+        positions = np.minimum(np.searchsorted(self.years, years), len(self.years) - 1)
+        found = self.years[positions] == years
+        result[found] = self.values[positions[found]]
+        return result
 
-        # Store the DataFrame in the dictionary
-        subgrid_data[subgrid] = subgrid_df
-    else:
-        print(f"No data found for subgrid: {subgrid}")
+# Fitted series: column -> (fingerprint, SeriesFit). Fits survive dataset version changes and
+# are only redone for series whose data changed.
+_fits = {}
+# Fingerprints of the current dataset version: column -> fingerprint
+_fingerprints = {}
+_fingerprints_version = None
+_fits_lock = threading.Lock()
+
+def get_series_fit(column, dataset=None):
+    """
+    Return the fit of one column, refitting it only if its data changed since it was last fitted.
+    dataset is a (version, DataFrame) pair from get_dataset; callers fitting several columns
+    should pass the same pair so every fit comes from one version of the data.
+    """
+    global _fingerprints_version
+    version, frame = dataset if dataset is not None else get_dataset()
+    with _fits_lock:
+        if _fingerprints_version != version:
+            _fingerprints.clear()
+            _fingerprints_version = version
+        fingerprint = _fingerprints.get(column)
+    if fingerprint is None:
+        fingerprint = _series_fingerprint(frame, column)
+        with _fits_lock:
+            if _fingerprints_version == version:
+                _fingerprints[column] = fingerprint
+
+    cached = _fits.get(column)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    fit = SeriesFit(frame['Year'].to_numpy(), frame[column].to_numpy())
+    with _fits_lock:
+        _fits[column] = (fingerprint, fit)
+    logger.debug(f"Fitted {column}")
+    return fit
 
 # Function to perform linear regression and predict future values
 def predict_future(df, column, target_year=2040):
-    # Drop rows with missing values in the specified column
-    df_clean = df.dropna(subset=[column])
-    
-    # Check if we have any data after dropping NaN values
-    if df_clean.empty:
+    """
+    Return the value of one column for a single year, using the same rules as the forecast cube.
+    """
+    fit = SeriesFit(df['Year'].to_numpy(), df[column].to_numpy())
+    if fit.min_year is None:
         logger.warning(f"No data available for {column} after dropping NaN values")
-        return np.array([target_year]), np.array([0.0])  # Return default values
-    
-    # Check if the target year is in our dataset
-    if target_year in df_clean['Year'].values:
-        # Return the actual value for that year
-        target_value = df_clean[df_clean['Year'] == target_year][column].values[0]
-        logger.debug(f"Found actual value for {column} in year {target_year}: {target_value}")
-        return np.array([target_year]), np.array([target_value])
-    
-    # Get the maximum and minimum year in the data
-    max_year = df_clean['Year'].max()
-    min_year = df_clean['Year'].min()
-    
-    logger.debug(f"Predicting {column} for year {target_year}. Data range: {min_year}-{max_year}")
-    
-    # For future predictions
-    if target_year > max_year:
-        try:
-            # Prepare the data for regression
-            X = df_clean['Year'].values.reshape(-1, 1)  # X is the years
-            y = df_clean[column].values  # y is the values
-            
-            # Fit the model
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Create single prediction point for the target year
-            pred_point = np.array([[target_year]])
-            prediction = model.predict(pred_point)
-            logger.debug(f"Predicted future value for {column} in year {target_year}: {prediction[0]}")
-            return np.array([target_year]), prediction
-        except Exception as e:
-            logger.error(f"Error predicting future value for {column} in year {target_year}: {e}")
-            return np.array([target_year]), np.array([0.0])
-    
-    # For interpolation (if target_year is between min and max)
-    if min_year < target_year < max_year:
-        try:
-            X = df_clean['Year'].values.reshape(-1, 1)
-            y = df_clean[column].values
-            
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            pred_point = np.array([[target_year]])
-            prediction = model.predict(pred_point)
-            logger.debug(f"Interpolated value for {column} in year {target_year}: {prediction[0]}")
-            return np.array([target_year]), prediction
-        except Exception as e:
-            logger.error(f"Error interpolating value for {column} in year {target_year}: {e}")
-            return np.array([target_year]), np.array([0.0])
-    
-    # If target_year is before our earliest data
-    logger.warning(f"Target year {target_year} is before earliest data point {min_year}")
-    return np.array([target_year]), np.array([0.0])
+    return np.array([target_year]), fit.evaluate([target_year])
 
-# Function to get predictions based on energy type and year range
-def get_peer_to_predictions(start_year=None, end_year=None):
+class ForecastCube:
     """
-    Predict energy metrics for a given year range.
+    Dense year x place x energy type array of peer-to-peer forecasts. NaN marks a value
+    that is not available, such as a metric a place does not report.
+    row_types lists the energy types emitted per place and in which order when the cube
+    is flattened to rows.
+    """
+    def __init__(self, years, places, energy_types, values, row_types):
+        self.years = years
+        self.places = places
+        self.energy_types = energy_types
+        self.values = values
+        self.row_types = row_types
 
-    Parameters:
-        start_year (int): The start year for predictions. Defaults to 2020 if null.
-        end_year (int): The end year for predictions. Defaults to 2026 if null.
+    @staticmethod
+    def label(place, energy_type):
+        # Consumption rows are labelled per place
+        return f'{place} {energy_type}' if energy_type == CONSUMPTION_METRIC else energy_type
 
-    Returns:
-        pd.DataFrame: A DataFrame containing predicted values for the selected metrics across the year range.
+    def to_columns(self):
+        """
+        Return the long-format rows (year, then place, then energy type) as one array per field.
+        """
+        slots = [self.energy_types.index(energy_type) for energy_type in self.row_types]
+        block = self.values[:, :, slots]
+        year_index, place_index, slot_index = np.nonzero(~np.isnan(block))
+        labels = np.array(
+            [[self.label(place, energy_type) for energy_type in self.row_types] for place in self.places],
+            dtype=object
+        ).reshape(len(self.places), len(slots))
+        return {
+            'Year': self.years[year_index],
+            'Place': np.array(self.places, dtype=object)[place_index],
+            'Energy Type': labels[place_index, slot_index],
+            'Predicted Value': block[year_index, place_index, slot_index]
+        }
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_columns())
+
+    def to_nested(self):
+        """
+        Return {year: {place: {energy type: value}}}, skipping unavailable values.
+        """
+        nested = {}
+        values = self.values.tolist()
+        for i, year in enumerate(self.years.tolist()):
+            year_values = {}
+            for j, place in enumerate(self.places):
+                place_values = {
+                    self.label(place, energy_type): value
+                    for energy_type, value in zip(self.energy_types, values[i][j])
+                    if value == value
+                }
+                if place_values:
+                    year_values[place] = place_values
+            nested[year] = year_values
+        return nested
+
+def build_forecast_cube(start_year, end_year, places=None, energy_types=None):
+    """
+    Evaluate the forecasts of every requested place and energy type over a year range.
+    Each series is fitted once per dataset version and evaluated for all years at once.
+    Only the requested series are fitted.
+    """
+    # Read the dataset once so every series of the cube is fitted on the same version
+    dataset = get_dataset()
+    frame = dataset[1]
+    years = np.arange(start_year, end_year + 1)
+    places = list(places) if places is not None else list(subgrids)
+    requested = set(energy_types) if energy_types is not None else set(ENERGY_TYPES)
+    values = np.full((len(years), len(places), len(ENERGY_TYPES)), np.nan)
+
+    # Visayas totals are only needed for the consumption estimates
+    visayas_generation = visayas_consumption = None
+    if CONSUMPTION_METRIC in requested:
+        if VISAYAS_GENERATION_COLUMN in frame.columns and frame[VISAYAS_GENERATION_COLUMN].count() > 0:
+            visayas_generation = get_series_fit(VISAYAS_GENERATION_COLUMN, dataset).evaluate(years)
+        else:
+            logger.warning(f"Column '{VISAYAS_GENERATION_COLUMN}' not found in DataFrame")
+        if VISAYAS_CONSUMPTION_COLUMN in frame.columns:
+            visayas_consumption = get_series_fit(VISAYAS_CONSUMPTION_COLUMN, dataset).evaluate(years)
+        else:
+            logger.warning(f"Column '{VISAYAS_CONSUMPTION_COLUMN}' not found in DataFrame")
+
+    for j, place in enumerate(places):
+        for k, energy_type in enumerate(ENERGY_TYPES):
+            column = f'{place} {energy_type}'
+            if energy_type in requested and column in frame.columns:
+                values[:, j, k] = get_series_fit(column, dataset).evaluate(years)
+
+        generation_column = f'{place} {GENERATION_METRIC}'
+        if visayas_generation is not None and visayas_consumption is not None and generation_column in frame.columns:
+            generation = get_series_fit(generation_column, dataset).evaluate(years)
+            # The place's share of Visayas generation applied to Visayas consumption; skipped when generation is 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                share = np.where(visayas_generation != 0, generation / visayas_generation * visayas_consumption, np.nan)
+            values[:, j, ENERGY_TYPES.index(CONSUMPTION_METRIC)] = share
+
+    # Generation, then consumption, then every metric (generation appears again as a metric)
+    row_types = [
+        energy_type for energy_type in [GENERATION_METRIC, CONSUMPTION_METRIC] + metrics
+        if energy_type in requested and energy_type in ENERGY_TYPES
+    ]
+    return ForecastCube(years, places, list(ENERGY_TYPES), values, row_types)
+
+def get_peer_to_cube(start_year=None, end_year=None, places=None, energy_types=None):
+    """
+    Return the forecast cube for a year range, applying the same defaults as get_peer_to_predictions.
     """
     if start_year is None:
         start_year = 2020
@@ -182,117 +363,24 @@ def get_peer_to_predictions(start_year=None, end_year=None):
         end_year = start_year
         
     logger.debug(f"Generating predictions for year range: {start_year} to {end_year}")
-    
-    all_predictions = []
-    
-    # Check if 'Visayas Total Power Generation (GWh)' exists in the DataFrame
-    visayas_gen_column = 'Visayas Total Power Generation (GWh)'
-    has_visayas_gen = visayas_gen_column in df.columns
-    if has_visayas_gen:
-        non_null_count = df[visayas_gen_column].count()
-        logger.debug(f"Column '{visayas_gen_column}' exists with {non_null_count} non-null values")
-    else:
-        logger.warning(f"Column '{visayas_gen_column}' not found in DataFrame")
-    
-    # Predict for each year in the range
-    for year in range(start_year, end_year + 1):
-        logger.debug(f"Processing predictions for year: {year}")
-        
-        # Create dictionaries to store Visayas power data
-        visayas_power_gen_dict = {}
-        visayas_consumption_dict = {}
-        
-        # Predict Visayas Total Power Generation for the specified year
-        if has_visayas_gen and non_null_count > 0:
-            try:
-                future_years, visayas_power_gen_predictions = predict_future(df, visayas_gen_column, target_year=year)
-                visayas_power_gen_dict = dict(zip(future_years, visayas_power_gen_predictions))
-            except Exception as e:
-                logger.error(f"Error predicting Visayas Total Power Generation for year {year}: {e}")
-        
-        # Predict Visayas Total Power Consumption for the specified year
-        visayas_consumption_column = 'Visayas Total Power Consumption (GWh)'
-        if visayas_consumption_column in df.columns:
-            try:
-                future_years, visayas_consumption_predictions = predict_future(df, visayas_consumption_column, target_year=year)
-                visayas_consumption_dict = dict(zip(future_years, visayas_consumption_predictions))
-            except Exception as e:
-                logger.error(f"Error predicting Visayas Total Power Consumption for year {year}: {e}")
-        else:
-            logger.warning(f"Column '{visayas_consumption_column}' not found in DataFrame")
-    
-        # Iterate over each subgrid (place)
-        for place, df_place in subgrid_data.items():
-            logger.debug(f"Processing data for {place} for year {year}")
-    
-            # Check if the required columns exist in the DataFrame
-            if 'Total Power Generation (GWh)' in df_place.columns:
-                try:
-                    # Predict the place's total power generation
-                    future_years, power_generation_predictions = predict_future(df_place, 'Total Power Generation (GWh)', target_year=year)
-                    
-                    # Only add predictions for the current year we're processing
-                    for i, yr in enumerate(future_years):
-                        if yr == year:
-                            logger.debug(f"Predicted Power Generation for {place} in {year}: {power_generation_predictions[i]}")
-                            
-                            # Add to predictions
-                            predictions_df = pd.DataFrame({
-                                'Year': [year],
-                                'Place': [place],
-                                'Energy Type': ['Total Power Generation (GWh)'],
-                                'Predicted Value': [power_generation_predictions[i]]
-                            })
-                            all_predictions.append(predictions_df)
-                            
-                            # Calculate and add consumption prediction
-                            if yr in visayas_power_gen_dict and yr in visayas_consumption_dict:
-                                try:
-                                    visayas_power_gen = visayas_power_gen_dict.get(yr)
-                                    visayas_consumption = visayas_consumption_dict.get(yr)
-                                    
-                                    if visayas_power_gen != 0:  # Prevent division by zero
-                                        # Calculate ratio and consumption
-                                        ratio = power_generation_predictions[i] / visayas_power_gen
-                                        place_consumption = ratio * visayas_consumption
-                                        
-                                        predictions_df_consumption = pd.DataFrame({
-                                            'Year': [year],
-                                            'Place': [place],
-                                            'Energy Type': [f'{place} Estimated Consumption (GWh)'],
-                                            'Predicted Value': [place_consumption]
-                                        })
-                                        all_predictions.append(predictions_df_consumption)
-                                except Exception as e:
-                                    logger.error(f"Error calculating consumption for {place} in year {year}: {e}")
-                except Exception as e:
-                    logger.error(f"Error predicting Total Power Generation for {place} in year {year}: {e}")
-            else:
-                logger.warning(f"Column 'Total Power Generation (GWh)' not found for {place}")
-    
-            # Predict future values for each metric
-            for metric in metrics:
-                if metric in df_place.columns:
-                    try:
-                        future_years, predictions = predict_future(df_place, metric, target_year=year)
-                        
-                        # Only add prediction for the current year
-                        for i, yr in enumerate(future_years):
-                            if yr == year:
-                                predictions_df = pd.DataFrame({
-                                    'Year': [year],
-                                    'Place': [place],
-                                    'Energy Type': [metric],
-                                    'Predicted Value': [predictions[i]]
-                                })
-                                all_predictions.append(predictions_df)
-                    except Exception as e:
-                        logger.error(f"Error predicting {metric} for {place} in year {year}: {e}")
-    
-    # Combine all predictions into a single DataFrame
-    if all_predictions:
-        all_predictions_df = pd.concat(all_predictions, ignore_index=True)
-        return all_predictions_df
-    else:
+    return build_forecast_cube(start_year, end_year, places, energy_types)
+
+# Function to get predictions based on energy type and year range
+def get_peer_to_predictions(start_year=None, end_year=None, places=None, energy_types=None):
+    """
+    Predict energy metrics for a given year range.
+
+    Parameters:
+        start_year (int): The start year for predictions. Defaults to 2020 if null.
+        end_year (int): The end year for predictions. Defaults to 2026 if null.
+        places (list): Subgrids to include. Defaults to every subgrid if null.
+        energy_types (list): Energy types to include, from ENERGY_TYPES. Defaults to all if null.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing predicted values for the selected metrics across the year range.
+    """
+    predictions = get_peer_to_cube(start_year, end_year, places, energy_types).to_frame()
+    if predictions.empty:
         logger.warning("No predictions generated for the specified year range.")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+    return predictions
@@ -1,88 +1,404 @@
 import numpy as np
-import pandas as pd
-from scipy.optimize import curve_fit
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.linear_model import LinearRegression
 import os
-import time
 import logging
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from mongodb import get_collection
+from datasets import load_excel_dataset_versioned
+from peertopeer import subgrids
 import json
+import threading
 from django.views.decorators.csrf import csrf_exempt
+from api.responses import json_response
 
-# Load dataset
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Dataset location; the workbook is read through the shared dataset cache
 script_dir = os.path.dirname(os.path.abspath(__file__))
 file_path = os.path.join(script_dir, 'peertopeer.xlsx')
-df = pd.read_excel(file_path)
-
-# Prepare data
-X = df[['Year']].values.flatten()  # Convert to 1D array
-y_solar_cost = df['Solar Cost (PHP/W)'] * 1000  # Convert to PHP/kW
-y_meralco_rate = df['MERALCO Rate (PHP/kWh)']
 
-# --- Step 1: Fit Exponential Decay Model to Solar Cost ---
+# Solar costs never fall below this floor (PHP per kW)
+MIN_SOLAR_COST_PER_KW = 20000
+# Assume average daily solar production per kW
+AVG_DAILY_PRODUCTION_KWH = 4  # kWh per kW per day
+# Daily yield assumption sampled by the uncertainty mode (kWh per kW per day), kept within the bounds
+SOLAR_YIELD_STD = float(os.getenv("SOLAR_YIELD_STD", "0.5"))
+SOLAR_YIELD_MIN = float(os.getenv("SOLAR_YIELD_MIN", "2.5"))
+SOLAR_YIELD_MAX = float(os.getenv("SOLAR_YIELD_MAX", "5.5"))
+# Monte Carlo draws used by default and the most a request may ask for
+DEFAULT_MONTE_CARLO_DRAWS = 100000
+MAX_MONTE_CARLO_DRAWS = 1000000
+PAYBACK_PERCENTILES = (5, 25, 50, 75, 95)
+# Households scored per vectorized chunk by score_portfolio
+PORTFOLIO_CHUNK_SIZE = int(os.getenv("PORTFOLIO_CHUNK_SIZE", "5000"))
+# Cash-flow simulation: system life in years, yearly discount rate and yearly output loss of the panels
+SOLAR_SYSTEM_LIFETIME_YEARS = int(os.getenv("SOLAR_SYSTEM_LIFETIME_YEARS", "25"))
+SOLAR_DISCOUNT_RATE = float(os.getenv("SOLAR_DISCOUNT_RATE", "0.06"))
+SOLAR_DEGRADATION_RATE = float(os.getenv("SOLAR_DEGRADATION_RATE", "0.005"))
+# Bracket and iterations of the IRR bisection
+IRR_BOUNDS = (-0.99, 10.0)
+IRR_ITERATIONS = 60
+# Years precomputed in the cost and rate lookup table; other years use the closed-form curves
+RECOMMENDATION_TABLE_START_YEAR = int(os.getenv("RECOMMENDATION_TABLE_START_YEAR", "2000"))
+RECOMMENDATION_TABLE_END_YEAR = int(os.getenv("RECOMMENDATION_TABLE_END_YEAR", "2100"))
 
 # Define the exponential decay function
-def exp_decay(x, a, b, c):
-    return a * np.exp(-b * (x - X.min())) + c  # Shift x to prevent large exponent values
+def exp_decay(x, a, b, c, x0=0.0):
+    return a * np.exp(-b * (x - x0)) + c  # Shift x by the first data year to prevent large exponent values
+
+def stable_decay(t, s, k, b):
+    """
+    exp_decay written as s + k * (1 - e^(-b t)) / b, with s and k the value and slope at t = 0.
+    The same curve, but its parameters stay well conditioned when the decay is nearly linear.
+    """
+    t = np.asarray(t, dtype=float)
+    b = np.asarray(b, dtype=float)
+    bt = b * t
+    # (1 - e^(-b t)) / b tends to t as b t -> 0
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        ramp = np.where(np.abs(bt) < 1e-8, t, -np.expm1(-bt) / np.where(b == 0, 1.0, b))
+    return s + k * ramp
+
+class SolarCurves:
+    """
+    Solar cost and MERALCO rate curves fitted to one version of the workbook, with a dense
+    year -> (solar cost, MERALCO rate) table over the configured horizon.
+    """
+    def __init__(self, df):
+        # scipy and scikit-learn are only needed when the curves are refitted, so they are imported
+        # here to keep worker start-up light
+        from scipy.optimize import curve_fit
+        from sklearn.preprocessing import PolynomialFeatures
+        from sklearn.linear_model import LinearRegression
+
+        # Prepare data
+        X = df['Year'].to_numpy(dtype=float)
+        y_solar_cost = df['Solar Cost (PHP/W)'].to_numpy(dtype=float) * 1000  # Convert to PHP/kW
+        y_meralco_rate = df['MERALCO Rate (PHP/kWh)'].to_numpy(dtype=float)
+        self.x0 = X.min()
+
+        # --- Step 1: Fit Exponential Decay Model to Solar Cost ---
+        with np.errstate(over='ignore'):
+            self.popt, self.pcov = curve_fit(
+                lambda x, a, b, c: exp_decay(x, a, b, c, self.x0), X, y_solar_cost, maxfev=5000
+            )
+
+        # --- Step 2: Fit Polynomial Regression Model to MERALCO Rate ---
+        poly = PolynomialFeatures(degree=2)  # Quadratic model for MERALCO rates
+        model_meralco = LinearRegression()
+        model_meralco.fit(poly.fit_transform(X.reshape(-1, 1)), y_meralco_rate)
+        # Closed form of the fitted quadratic: rate = c0 + c1 * year + c2 * year^2
+        self.meralco_coefficients = np.array([
+            model_meralco.intercept_ + model_meralco.coef_[0], model_meralco.coef_[1], model_meralco.coef_[2]
+        ])
+
+        # Uncertainty of both fits, used by simulate_payback
+        self.meralco_residuals = y_meralco_rate - self.meralco_rate_curve(X, clip=False)
+        # The covariance curve_fit returns for (a, b, c) is numerically useless when a and c nearly
+        # cancel, so it is recomputed at the same optimum for the equivalent (s, k, b) form
+        a, b, c = self.popt
+        self.cost_parameters = np.array([a + c, -a * b, b])
+        cost_covariance = self._cost_covariance(X - self.x0, y_solar_cost)
+        self.cost_parameter_factor = self._covariance_factor(cost_covariance)
+
+        # Dense lookup table, indexed by year - table_start
+        self.table_start = RECOMMENDATION_TABLE_START_YEAR
+        table_years = np.arange(RECOMMENDATION_TABLE_START_YEAR, RECOMMENDATION_TABLE_END_YEAR + 1, dtype=float)
+        self.cost_table = self.solar_cost_curve(table_years)
+        self.rate_table = self.meralco_rate_curve(table_years)
+
+    def solar_cost_curve(self, years):
+        with np.errstate(over='ignore'):
+            return np.maximum(exp_decay(np.asarray(years, dtype=float), *self.popt, self.x0), MIN_SOLAR_COST_PER_KW)
+
+    def meralco_rate_curve(self, years, clip=True):
+        years = np.asarray(years, dtype=float)
+        c0, c1, c2 = self.meralco_coefficients
+        rates = c0 + years * (c1 + c2 * years)
+        return np.maximum(rates, 0) if clip else rates
+
+    def _cost_covariance(self, t, y):
+        """
+        Return the least squares covariance s^2 (J^T J)^-1 of the (s, k, b) parameters at the fitted values.
+        """
+        s, k, b = self.cost_parameters
+        dof = len(t) - 3
+        if dof <= 0:
+            return np.full((3, 3), np.inf)
+        residuals = y - stable_decay(t, s, k, b)
+        step = 1e-6 * max(abs(b), 1e-3)
+        jacobian = np.column_stack([
+            np.ones_like(t),
+            stable_decay(t, 0.0, 1.0, b),
+            (stable_decay(t, s, k, b + step) - stable_decay(t, s, k, b - step)) / (2 * step)
+        ])
+        # Scale the columns so the inversion does not lose the small parameters
+        norms = np.linalg.norm(jacobian, axis=0)
+        norms[norms == 0] = 1.0
+        scaled = jacobian / norms
+        return (residuals @ residuals / dof) * np.linalg.pinv(scaled.T @ scaled) / np.outer(norms, norms)
+
+    @staticmethod
+    def _covariance_factor(covariance):
+        """
+        Return L with L @ L.T equal to the covariance, so parameter draws are mean + z @ L.T.
+        Returns zeros when curve_fit could not estimate the covariance.
+        """
+        if not np.all(np.isfinite(covariance)):
+            logger.warning("Solar cost parameter covariance could not be estimated; sampling the fitted curve only")
+            return np.zeros_like(covariance)
+        # Factor the correlation matrix so parameters of very different scales keep their precision;
+        # the eigendecomposition tolerates covariances that are only positive semi-definite
+        scale = np.sqrt(np.clip(np.diag(covariance), 0, None))
+        safe_scale = np.where(scale > 0, scale, 1.0)
+        correlation = covariance / np.outer(safe_scale, safe_scale)
+        eigenvalues, eigenvectors = np.linalg.eigh((correlation + correlation.T) / 2)
+        return scale[:, None] * (eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None)))
+
+    def _lookup(self, table, curve, years):
+        """
+        Read whole years inside the horizon from the table and compute the rest from the curve.
+        """
+        years = np.asarray(years, dtype=float)
+        index = years - self.table_start
+        inside = (index >= 0) & (index < len(table)) & (index == np.floor(index))
+        if inside.all():
+            return table[index.astype(np.intp)]
+        result = np.empty(years.shape)
+        result[inside] = table[index[inside].astype(np.intp)]
+        result[~inside] = curve(years[~inside])
+        return result
+
+    def solar_costs(self, years):
+        return self._lookup(self.cost_table, self.solar_cost_curve, years)
 
-# Fit the exponential model to the data
-popt, _ = curve_fit(exp_decay, X, y_solar_cost, maxfev=5000)
+    def meralco_rates(self, years):
+        return self._lookup(self.rate_table, self.meralco_rate_curve, years)
+
+# Curves for the current workbook: (workbook stamp, SolarCurves)
+_curves = (None, None)
+_curves_lock = threading.Lock()
+
+def get_curves():
+    """
+    Return the fitted curves, refitting them and rebuilding the lookup table when the workbook changes.
+    """
+    global _curves
+    stamp, df = load_excel_dataset_versioned(file_path)
+    if _curves[0] == stamp:
+        return _curves[1]
+    with _curves_lock:
+        if _curves[0] != stamp:
+            _curves = (stamp, SolarCurves(df))
+            logger.info(f"Fitted solar cost and MERALCO rate curves for {file_path}")
+        return _curves[1]
 
 # Function to predict solar cost using the fitted model
 def predict_solar_cost(year):
-    return max(exp_decay(year, *popt), 20000)  # Keep above PHP 10,000 per kW
+    return float(get_curves().solar_costs([year])[0])  # Kept above PHP 20,000 per kW
 
-# --- Step 2: Fit Polynomial Regression Model to MERALCO Rate ---
-poly = PolynomialFeatures(degree=2)  # Quadratic model for MERALCO rates
-X_poly = poly.fit_transform(X.reshape(-1, 1))  # Transform X for polynomial regression
+def predict_meralco_rates(years):
+    """
+    Return the MERALCO rate for an array of years from the lookup table.
+    """
+    return get_curves().meralco_rates(years)
 
-# Train Polynomial Regression for MERALCO Rate
-model_meralco = LinearRegression()
-model_meralco.fit(X_poly, y_meralco_rate)
+def predict_solar_costs(years):
+    """
+    Return the solar cost for an array of years from the lookup table.
+    """
+    return get_curves().solar_costs(years)
 
 # --- Step 3: Prediction Function ---
-def predict_solar_capacity_and_roi(budget, year):
-    year_poly = poly.transform(np.array([[year]]))  # Transform year for polynomial model
+def evaluate_solar_recommendations(budgets, years):
+    """
+    Evaluate recommendations for arrays of budgets and years broadcast against each other.
+    Returns a dictionary of arrays with the broadcast shape and the same fields as
+    predict_solar_capacity_and_roi; roi_years is inf where there are no savings.
+    """
+    budgets = np.asarray(budgets, dtype=float)
+    year_labels = np.asarray(years)
+    years = year_labels.astype(float)
+    shape = np.broadcast_shapes(budgets.shape, years.shape)
 
-    predicted_solar_cost = predict_solar_cost(year)  # Exponential decay for solar cost
-    predicted_meralco_rate = max(model_meralco.predict(year_poly)[0], 0)  # Polynomial regression for MERALCO rate
+    # Costs and rates are read from the per-year lookup table
+    solar_costs = predict_solar_costs(years)
+    meralco_rates = predict_meralco_rates(years)
 
-    # Calculate installable solar capacity
-    capacity_kw = budget / predicted_solar_cost if predicted_solar_cost > 0 else 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate installable solar capacity
+        capacity_kw = np.where(solar_costs > 0, budgets / solar_costs, 0.0)
+        # Calculate yearly energy production and savings
+        yearly_energy_production = capacity_kw * AVG_DAILY_PRODUCTION_KWH * 365
+        yearly_savings = yearly_energy_production * meralco_rates
+        # Calculate ROI (simple payback period)
+        roi_years = np.where(yearly_savings > 0, budgets / yearly_savings, np.inf)
 
-    # Assume average daily solar production per kW
-    avg_daily_production_kwh = 4  # kWh per kW per day
+    return {
+        'year': np.broadcast_to(year_labels, shape),
+        'budget': np.broadcast_to(budgets, shape),
+        'predicted_solar_cost': np.broadcast_to(solar_costs, shape),
+        'predicted_meralco_rate': np.broadcast_to(meralco_rates, shape),
+        'capacity_kw': np.broadcast_to(capacity_kw, shape),
+        'yearly_energy_production': np.broadcast_to(yearly_energy_production, shape),
+        'yearly_savings': np.broadcast_to(yearly_savings, shape),
+        'roi_years': np.broadcast_to(roi_years, shape)
+    }
+
+def evaluate_solar_grid(budgets, years):
+    """
+    Evaluate every (year, budget) pair in one NumPy broadcast.
+    Returns arrays shaped (len(years), len(budgets)); the curves are evaluated once per year.
+    """
+    return evaluate_solar_recommendations(np.asarray(budgets, dtype=float)[None, :], np.asarray(years)[:, None])
 
-    # Calculate yearly energy production
-    yearly_energy_production = capacity_kw * avg_daily_production_kwh * 365
+def simulate_payback(budget, year, draws=DEFAULT_MONTE_CARLO_DRAWS, percentiles=PAYBACK_PERCENTILES, seed=None):
+    """
+    Estimate the distribution of the payback period with a vectorized Monte Carlo simulation.
+    Each draw samples the solar cost curve parameters from their fitted covariance, the MERALCO
+    rate by adding a resampled residual of the quadratic fit, and the daily yield from a normal
+    distribution around AVG_DAILY_PRODUCTION_KWH clipped to [SOLAR_YIELD_MIN, SOLAR_YIELD_MAX].
+    Draws that never pay back count as inf.
+    """
+    curves = get_curves()
+    rng = np.random.default_rng(seed)
+    year_offset = float(year) - curves.x0
+
+    # One call draws the three solar cost parameter deviates and the yield deviate of every draw
+    normals = rng.standard_normal((4, draws))
 
-    # Calculate yearly savings
-    yearly_savings = yearly_energy_production * predicted_meralco_rate
+    # Solar cost: one (s, k, b) parameter vector per draw
+    s, k, b = curves.cost_parameters[:, None] + curves.cost_parameter_factor @ normals[:3]
+    solar_costs = stable_decay(year_offset, s, k, b)
+    np.maximum(solar_costs, MIN_SOLAR_COST_PER_KW, out=solar_costs)
 
-    # Calculate ROI (simple payback period)
-    roi_years = budget / yearly_savings if yearly_savings > 0 else float('inf')
+    # MERALCO rate: fitted curve plus a residual drawn from the fit
+    residuals = curves.meralco_residuals
+    meralco_rates = curves.meralco_rate_curve(year, clip=False) + residuals[rng.integers(0, len(residuals), draws)]
+    np.maximum(meralco_rates, 0, out=meralco_rates)
 
-    # Display the results
-    print(f"Year of Investment: {year}")
-    print(f"Predicted Solar Cost: PHP {predicted_solar_cost:.2f} per kW")
-    print(f"Predicted MERALCO Rate: PHP {predicted_meralco_rate:.2f} per kWh")
-    print(f"Installable Solar Capacity: {capacity_kw:.2f} kW")
-    print(f"Estimated Yearly Energy Production: {yearly_energy_production:.2f} kWh")
-    print(f"Estimated Yearly Savings: PHP {yearly_savings:.2f}")
-    print(f"Estimated ROI (Payback Period): {roi_years:.2f} years")
+    daily_yield = np.clip(AVG_DAILY_PRODUCTION_KWH + SOLAR_YIELD_STD * normals[3], SOLAR_YIELD_MIN, SOLAR_YIELD_MAX)
 
+    # Payback is budget / savings = solar cost / (yield * 365 * rate) for any positive budget
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yearly_savings_per_peso = daily_yield * 365 * meralco_rates / solar_costs
+        roi_years = 1 / yearly_savings_per_peso if budget > 0 else np.full(draws, np.inf)
+    roi_years[~(roi_years > 0)] = np.inf
+
+    finite = np.isfinite(roi_years)
+    # inf - inf interpolation gives nan; those percentiles are inf
+    with np.errstate(invalid='ignore'):
+        quantiles = np.nan_to_num(np.percentile(roi_years, percentiles), nan=np.inf)
     return {
-        'year': year,
-        'predicted_solar_cost': predicted_solar_cost,
-        'predicted_meralco_rate': predicted_meralco_rate,
+        'draws': draws,
+        'roi_years': {f'p{percentile:g}': value for percentile, value in zip(percentiles, quantiles.tolist())},
+        'roi_years_mean': float(roi_years[finite].mean()) if finite.any() else float('inf'),
+        'probability_no_payback': float(1 - finite.mean()),
+        'yearly_savings_mean': float(budget * np.nanmean(yearly_savings_per_peso))
+    }
+
+def _irr(cash_flows, periods):
+    """
+    Internal rate of return of every row of a cash-flow matrix, by bisection on all rows at once.
+    Rows whose NPV does not change sign inside IRR_BOUNDS get nan.
+    """
+    low = np.full(cash_flows.shape[0], IRR_BOUNDS[0])
+    high = np.full(cash_flows.shape[0], IRR_BOUNDS[1])
+
+    def npv_at(rates):
+        return (cash_flows / (1 + rates[:, None]) ** periods).sum(axis=1)
+
+    npv_low = npv_at(low)
+    bracketed = np.sign(npv_low) != np.sign(npv_at(high))
+    for _ in range(IRR_ITERATIONS):
+        middle = (low + high) / 2
+        npv_middle = npv_at(middle)
+        # Keep the half whose ends still have opposite signs
+        same_sign = np.sign(npv_middle) == np.sign(npv_low)
+        low = np.where(same_sign, middle, low)
+        npv_low = np.where(same_sign, npv_middle, npv_low)
+        high = np.where(same_sign, high, middle)
+    return np.where(bracketed, (low + high) / 2, np.nan)
+
+def simulate_cash_flows(budget, years, lifetime=SOLAR_SYSTEM_LIFETIME_YEARS, discount_rate=SOLAR_DISCOUNT_RATE,
+                        degradation_rate=SOLAR_DEGRADATION_RATE):
+    """
+    Project the cash flows of investing the budget in each candidate year, all years in one pass.
+    Period 0 is the investment; period t = 1..lifetime earns the savings of calendar year
+    year + t - 1 at the forecast MERALCO rate, with the output reduced by degradation_rate per year.
+    Returns a dictionary of arrays with one value per candidate year, plus the cash-flow matrix.
+    NPV is valued at the investment year; npv_present discounts it to the first candidate year.
+    """
+    curves = get_curves()
+    years = np.asarray(years)
+    periods = np.arange(lifetime + 1)
+
+    solar_costs = curves.solar_costs(years)
+    capacity_kw = np.where(solar_costs > 0, budget / solar_costs, 0.0)
+
+    # Rates for every (investment year, operating year) pair come from the lookup table
+    operating_years = years[:, None] + periods[None, 1:] - 1
+    meralco_rates = curves.meralco_rates(operating_years)
+    output_kwh = (capacity_kw * AVG_DAILY_PRODUCTION_KWH * 365)[:, None] * (1 - degradation_rate) ** periods[None, :-1]
+
+    cash_flows = np.empty((len(years), lifetime + 1))
+    cash_flows[:, 0] = -budget
+    cash_flows[:, 1:] = output_kwh * meralco_rates
+
+    discounted = cash_flows / (1 + discount_rate) ** periods
+    npv = discounted.sum(axis=1)
+    cumulative = np.cumsum(discounted, axis=1)
+
+    # Discounted payback: first period where the cumulative discounted cash flow turns non-negative,
+    # interpolated within that period
+    paid_back = cumulative[:, 1:] >= 0
+    period = np.argmax(paid_back, axis=1) + 1
+    rows = np.arange(len(years))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = -cumulative[rows, period - 1] / discounted[rows, period]
+        discounted_payback = np.where(paid_back.any(axis=1) & (budget > 0), period - 1 + fraction, np.inf)
+        simple_payback = np.where(cash_flows[:, 1] > 0, budget / cash_flows[:, 1], np.inf)
+
+    return {
+        'year': years,
+        'predicted_solar_cost': solar_costs,
         'capacity_kw': capacity_kw,
-        'yearly_energy_production': yearly_energy_production,
-        'yearly_savings': yearly_savings,
-        'roi_years': roi_years
+        'first_year_savings': cash_flows[:, 1],
+        'lifetime_savings': cash_flows[:, 1:].sum(axis=1),
+        'npv': npv,
+        'npv_present': npv / (1 + discount_rate) ** (years - years[0]),
+        'irr': _irr(cash_flows, periods) if budget > 0 else np.full(len(years), np.nan),
+        'discounted_payback': discounted_payback,
+        'simple_payback': simple_payback,
+        'cash_flows': cash_flows
+    }
+
+def find_best_investment_year(budget, start_year, end_year, **options):
+    """
+    Simulate every investment year in the window and return the simulation with the year whose
+    NPV, discounted to the start of the window, is highest.
+    """
+    simulation = simulate_cash_flows(budget, np.arange(start_year, end_year + 1), **options)
+    best = int(np.argmax(simulation['npv_present']))
+    return {
+        'best_year': int(simulation['year'][best]),
+        'best_npv_present': float(simulation['npv_present'][best]),
+        'simulation': simulation
     }
 
+def predict_solar_capacity_and_roi(budget, year):
+    grid = evaluate_solar_grid([budget], [year])
+    result = {key: float(values[0, 0]) for key, values in grid.items() if key not in ('year', 'budget')}
+
+    logger.debug(
+        f"Year of Investment: {year}, solar cost: PHP {result['predicted_solar_cost']:.2f} per kW, "
+        f"MERALCO rate: PHP {result['predicted_meralco_rate']:.2f} per kWh, capacity: {result['capacity_kw']:.2f} kW, "
+        f"yearly production: {result['yearly_energy_production']:.2f} kWh, yearly savings: PHP {result['yearly_savings']:.2f}, "
+        f"ROI: {result['roi_years']:.2f} years"
+    )
+
+    return {'year': year, **result}
+
 def get_solar_recommendations(year, budget):
     """
     Get solar recommendations based on the given year and budget.
@@ -129,18 +445,83 @@ def get_solar_recommendations(year, budget):
         'cost_benefit_analysis': cost_benefit_analysis
     }
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+def _parse_household(row, subgrid_lookup):
+    """
+    Validate one portfolio row. Returns (budget, year, subgrid) or raises ValueError.
+    """
+    if isinstance(row, Exception):
+        raise ValueError(str(row))
+    if not isinstance(row, dict):
+        raise ValueError("Expected an object with budget, year and subgrid")
+    try:
+        budget = float(str(row.get('budget', '')).replace(',', '').strip())
+    except ValueError:
+        raise ValueError(f"Invalid budget: {row.get('budget')!r}")
+    if not np.isfinite(budget) or budget < 0:
+        raise ValueError(f"Invalid budget: {row.get('budget')!r}")
+    try:
+        year = float(str(row.get('year', row.get('Year', ''))).strip())
+    except ValueError:
+        year = np.nan
+    if not np.isfinite(year) or year != int(year):
+        raise ValueError(f"Invalid year: {row.get('year', row.get('Year'))!r}")
+    subgrid = subgrid_lookup.get(str(row.get('subgrid', '')).strip().lower())
+    if subgrid is None:
+        raise ValueError(f"Unknown subgrid {row.get('subgrid')!r}. Available subgrids: {subgrids}")
+    return budget, int(year), subgrid
 
-# MongoDB connection details
-MONGO_URI = os.getenv("MONGODB_URI")  # Load MongoDB URI from environment variables
-DATABASE_NAME = "ecopulse"  # Database name
+def score_portfolio(rows, chunk_size=PORTFOLIO_CHUNK_SIZE):
+    """
+    Score an iterable of households ({budget, year, subgrid, optional id}) in vectorized chunks.
+    Yields one result per row, in input order; invalid rows yield status 'error' with a message.
+    Only one chunk is held in memory at a time.
+    The subgrid is validated and echoed back for grouping the results, but does not change the
+    score: the solar cost and MERALCO rate curves are the same for every subgrid.
+    """
+    subgrid_lookup = {subgrid.lower(): subgrid for subgrid in subgrids}
+    fields = ['predicted_solar_cost', 'predicted_meralco_rate', 'capacity_kw', 'yearly_energy_production',
+              'yearly_savings', 'roi_years']
+    chunk = []
+    row_number = 0
+
+    def flush(chunk):
+        results = []
+        valid = []
+        for number, row in chunk:
+            result = {'row': number}
+            if isinstance(row, dict) and row.get('id') not in (None, ''):
+                result['id'] = row['id']
+            try:
+                budget, year, subgrid = _parse_household(row, subgrid_lookup)
+                result.update(status='success', subgrid=subgrid, year=year, budget=budget)
+                valid.append((len(results), budget, year))
+            except ValueError as e:
+                result.update(status='error', message=str(e))
+            results.append(result)
+
+        if valid:
+            positions, budgets, years = zip(*valid)
+            evaluated = evaluate_solar_recommendations(np.array(budgets), np.array(years))
+            columns = [evaluated[field].tolist() for field in fields]
+            for position, values in zip(positions, zip(*columns)):
+                results[position].update(zip(fields, values))
+        return results
+
+    for row in rows:
+        chunk.append((row_number, row))
+        row_number += 1
+        if len(chunk) >= chunk_size:
+            yield from flush(chunk)
+            chunk = []
+    if chunk:
+        yield from flush(chunk)
+
+# MongoDB connection details (client and URI are shared through mongodb.py)
 RECOMMENDATION_COLLECTION = "recommendation"  # Collection name for recommendations
 
 def connect_to_mongodb_recommendation(retries=3, delay=5):
     """
-    Connect to MongoDB Atlas and return the recommendations collection.
+    Return the recommendations collection from the process-wide pooled MongoDB client.
     Retries the connection in case of failure.
     
     Parameters:
@@ -150,21 +531,15 @@ def connect_to_mongodb_recommendation(retries=3, delay=5):
     Returns:
         pymongo.collection.Collection: The MongoDB collection for recommendations
     """
-    for attempt in range(retries):
-        try:
-            client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-            db = client[DATABASE_NAME]
-            collection = db[RECOMMENDATION_COLLECTION]
-            # Attempt to ping the server to check the connection
-            client.admin.command('ping')
-            logger.debug("Connected to MongoDB Atlas recommendations successfully.")
-            return collection
-        except ConnectionFailure as e:
-            logger.error(f"Error connecting to MongoDB recommendations (attempt {attempt + 1}): {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                raise
+    return get_collection(RECOMMENDATION_COLLECTION, retries=retries, delay=delay)
+
+def ensure_recommendation_indexes(retries=1):
+    """
+    Create the (Year, _id) index used to page through recommendation records.
+    Run through the ensure_mongo_indexes management command; safe to run repeatedly.
+    """
+    collection = connect_to_mongodb_recommendation(retries=retries)
+    collection.create_index([('Year', 1), ('_id', 1)], name='Year_id')
 
 @csrf_exempt
 def recommendation_records(request):
@@ -178,7 +553,7 @@ def recommendation_records(request):
         request (HttpRequest): The Django HTTP request object
         
     Returns:
-        JsonResponse: JSON response with operation status and data
+        HttpResponse: JSON response with operation status and data
     """
     try:
         collection = connect_to_mongodb_recommendation()
@@ -194,15 +569,10 @@ def recommendation_records(request):
             
             # Fetch records
             records_cursor = collection.find(query)
-            records = []
-            
-            # Process each record
-            for record in records_cursor:
-                # Convert ObjectId to string for JSON serialization
-                record['_id'] = str(record['_id'])
-                records.append(record)
+            # ObjectIds are serialized by json_response
+            records = list(records_cursor)
             
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'records': records
             })
@@ -219,14 +589,14 @@ def recommendation_records(request):
             result = collection.insert_one(data)
             
             # Return success response with new record ID
-            return JsonResponse({
+            return json_response({
                 'status': 'success',
                 'message': 'Recommendation created successfully',
                 'id': str(result.inserted_id)
             })
             
         else:
-            return JsonResponse({
+            return json_response({
                 'status': 'error',
                 'message': 'Method not allowed'
             }, status=405)
@@ -236,7 +606,7 @@ def recommendation_records(request):
         logger.error(f"Error in recommendation_records: {str(e)}")
         
         # Return error response
-        return JsonResponse({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from mongodb import get_collection
+
+# Configure the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds to wait after the last retrain request before training starts
+TRAINING_DEBOUNCE_SECONDS = float(os.getenv("TRAINING_DEBOUNCE_SECONDS", "2"))
+# Number of finished jobs kept in memory per worker
+TRAINING_JOB_HISTORY = int(os.getenv("TRAINING_JOB_HISTORY", "100"))
+# Collection mirroring the job table so any worker can report a job's status
+TRAINING_JOBS_COLLECTION = "trainingJobs"
+
+# Job table: job id -> job dictionary, oldest first
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_jobs_changed = threading.Condition(_jobs_lock)
+# The queued job that new retrain requests are coalesced into
+_pending_job_id = None
+_worker = None
+
+def _reset_after_fork():
+    """
+    Start every forked worker with an empty job table; the training thread does not survive a fork.
+    """
+    global _jobs, _jobs_lock, _jobs_changed, _pending_job_id, _worker
+    _jobs = OrderedDict()
+    _jobs_lock = threading.Lock()
+    _jobs_changed = threading.Condition(_jobs_lock)
+    _pending_job_id = None
+    _worker = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _persist(job):
+    """
+    Mirror a job to MongoDB. Failures are logged and never interrupt training.
+    """
+    try:
+        get_collection(TRAINING_JOBS_COLLECTION).replace_one({'_id': job['job_id']}, dict(job), upsert=True)
+    except Exception as e:
+        logger.error(f"Error saving training job {job['job_id']}: {e}")
+
+def _ensure_worker():
+    """
+    Start the background training thread if it is not running. Must be called with _jobs_lock held.
+    """
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_worker_loop, name='model-training', daemon=True)
+        _worker.start()
+
+def enqueue_retrain(reason=None):
+    """
+    Request a retrain of all prediction models and return the job it was assigned to.
+    Requests arriving while a job is still queued are merged into that job, and training
+    starts only once no new request has arrived for TRAINING_DEBOUNCE_SECONDS.
+    """
+    global _pending_job_id
+    with _jobs_changed:
+        run_after = time.monotonic() + TRAINING_DEBOUNCE_SECONDS
+        job = _jobs.get(_pending_job_id) if _pending_job_id else None
+        if job is not None:
+            job['requests'] += 1
+            job['_run_after'] = run_after
+            if reason and reason not in job['reasons']:
+                job['reasons'].append(reason)
+        else:
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'status': 'queued',
+                'reasons': [reason] if reason else [],
+                'requests': 1,
+                'created_at': _now(),
+                'started_at': None,
+                'finished_at': None,
+                'progress': {'completed': 0, 'total': None, 'current': None},
+                'result': None,
+                'error': None,
+                'model_version': None,
+                '_run_after': run_after,
+            }
+            _jobs[job['job_id']] = job
+            _pending_job_id = job['job_id']
+            # Forget the oldest finished jobs
+            while len(_jobs) > TRAINING_JOB_HISTORY:
+                oldest_id = next(iter(_jobs))
+                if _jobs[oldest_id]['status'] in ('queued', 'running'):
+                    break
+                del _jobs[oldest_id]
+        _ensure_worker()
+        _jobs_changed.notify()
+        snapshot = _public(job)
+    _persist(snapshot)
+    logger.info(f"Retrain requested ({reason}); assigned to job {snapshot['job_id']}")
+    return snapshot
+
+def _public(job):
+    return {key: value for key, value in job.items() if not key.startswith('_')}
+
+def get_job(job_id):
+    """
+    Return a copy of a training job, or None if it is unknown.
+    Jobs started by other workers are looked up in MongoDB.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return _public(job)
+    try:
+        job = get_collection(TRAINING_JOBS_COLLECTION).find_one({'_id': job_id})
+    except Exception as e:
+        logger.error(f"Error loading training job {job_id}: {e}")
+        return None
+    if job is None:
+        return None
+    job.pop('_id', None)
+    return job
+
+def _worker_loop():
+    """
+    Run queued training jobs one at a time.
+    """
+    global _pending_job_id
+    # Imported here so the module can be loaded without pulling in the training stack
+    from linearregression_predictiveanalysis import train_and_save_models
+
+    while True:
+        with _jobs_changed:
+            while _pending_job_id is None:
+                _jobs_changed.wait()
+            job = _jobs[_pending_job_id]
+            delay = job['_run_after'] - time.monotonic()
+            if delay > 0:
+                # Wait for the debounce window; a new request pushes it further out
+                _jobs_changed.wait(delay)
+                continue
+            _pending_job_id = None
+            job['status'] = 'running'
+            job['started_at'] = _now()
+            snapshot = _public(job)
+        _persist(snapshot)
+
+        def progress(completed, total, target):
+            with _jobs_lock:
+                job['progress'] = {'completed': completed, 'total': total, 'current': target}
+                snapshot = _public(job)
+            _persist(snapshot)
+
+        try:
+            logger.info(f"Training job {job['job_id']} started")
+            result = train_and_save_models(progress=progress)
+            with _jobs_lock:
+                job['result'] = result
+                job['model_version'] = result.get('model_version')
+                job['status'] = 'succeeded' if result.get('status') == 'success' else 'failed'
+                if job['status'] == 'failed':
+                    job['error'] = result.get('message')
+        except Exception as e:
+            logger.error(f"Training job {job['job_id']} failed: {e}")
+            with _jobs_lock:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+        with _jobs_lock:
+            job['finished_at'] = _now()
+            snapshot = _public(job)
+        _persist(snapshot)
+        logger.info(f"Training job {job['job_id']} {snapshot['status']}")